@@ -0,0 +1,110 @@
+"""
+Benchmark: chart series extraction from converted history samples
+
+Compares the per-chart dict walks of the reporter before columns existed
+(one full pass per chart over its five series, with the network chart
+re-summing interfaces per sample; no timestamp parsing, as those charts did
+no downsampling) against build_columns' single pass over the same converted
+samples (all eight columns plus the epoch seconds LTTB needs), and against
+what /api/charts does with a warm cache: columns stacked from cached
+compact samples.
+
+Usage: python benchmarks/bench_chart_columns.py [sizes...]
+"""
+
+import os
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'reporting'))
+
+from columns import build_columns, compact_sample, columns_from_samples
+
+
+def make_samples(count):
+    """Converted samples shaped like _convert_metrics() output, 3 s apart"""
+    start = datetime.now() - timedelta(seconds=3 * count)
+    samples = []
+    for i in range(count):
+        samples.append({
+            'system_info': {'collection_time': (start + timedelta(seconds=3 * i)).isoformat()},
+            'cpu': {'usage_percent': random.uniform(0, 100)},
+            'memory': {'usage_percent': random.uniform(40, 90), 'swap_usage_percent': random.uniform(0, 10)},
+            'disk': {'filesystems': [
+                {'mountpoint': '/', 'usage_percent': random.uniform(20, 80)},
+                {'mountpoint': '/home', 'usage_percent': random.uniform(20, 80)}
+            ]},
+            'network': {'interfaces': [
+                {'interface': 'All', 'rx_bytes': 1024**3 + i * 4096, 'tx_bytes': 1024**2 + i * 2048}
+            ]},
+            'gpu': {'gpu': {'utilization_percent': random.uniform(0, 100)}},
+            'system_load': {'load_average': {'1min': random.uniform(0, 8)}}
+        })
+    return samples
+
+
+def dict_walks(historical_data):
+    """Series extraction as generate_cpu/memory/network_chart did it before: one pass per chart"""
+    timestamps = []
+    cpu_usage = []
+    for data in historical_data:
+        timestamps.append(data['system_info']['collection_time'])
+        cpu_usage.append(float(data['cpu']['usage_percent']))
+
+    timestamps = []
+    mem_usage = []
+    swap_usage = []
+    for data in historical_data:
+        timestamps.append(data['system_info']['collection_time'])
+        mem_usage.append(float(data['memory']['usage_percent']))
+        swap_usage.append(float(data['memory']['swap_usage_percent']))
+
+    timestamps = []
+    total_rx = []
+    total_tx = []
+    for data in historical_data:
+        timestamps.append(data['system_info']['collection_time'])
+        interfaces = data['network']['interfaces']
+        total_rx.append(sum(int(iface['rx_bytes']) for iface in interfaces) / (1024**2))
+        total_tx.append(sum(int(iface['tx_bytes']) for iface in interfaces) / (1024**2))
+
+
+def columnar(historical_data):
+    """Series extraction from one pass over every column"""
+    columns = build_columns(historical_data)
+    columns['cpu.usage_percent'], columns['memory.usage_percent']
+    columns['memory.swap_usage_percent'], columns['network.rx_mb'], columns['network.tx_mb']
+
+
+def compact(samples):
+    """Columns from compact samples, as load_entry_columns() builds them from the cache"""
+    columns_from_samples(samples)
+
+
+def best_of(func, samples, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(samples)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    print(f"{'samples':>10} {'dict walks':>12} {'columnar':>12} {'compact':>12} "
+          f"{'walks/columnar':>15} {'walks/compact':>14}")
+    for size in sizes:
+        samples = make_samples(size)
+        walks = best_of(dict_walks, samples)
+        cols = best_of(columnar, samples)
+        cached = [compact_sample(data) for data in samples]
+        warm = best_of(compact, cached)
+        print(f"{size:>10} {walks * 1000:>10.1f}ms {cols * 1000:>10.1f}ms {warm * 1000:>10.1f}ms "
+              f"{walks / cols:>14.2f}x {walks / warm:>13.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: /api/historical with and without a fields= projection
+
+Writes --samples samples 3 s apart to a temporary history directory, using
+one document collected on this machine (process lists and all) with its
+numeric fields varied, then times /api/historical/24 for the full
+documents and for two chart fields (served from history columns). Each is
+timed cold, in a fresh interpreter with empty caches, and warm.
+
+Usage: python benchmarks/bench_fields.py [--samples N]
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'reporting'))
+sys.path.insert(0, ROOT)
+
+QUERIES = {
+    'full documents': '',
+    'cpu + memory usage': '&fields=cpu.usage_percent,memory.usage_percent',
+}
+
+
+def populate(root, count):
+    import monitor_linux
+    from schema import collector_output
+    from history_store import HistoryStore
+
+    base = collector_output(monitor_linux.collect_metrics())
+    store = HistoryStore(os.path.join(root, 'data', 'metrics', 'history'))
+    now = time.time()
+    for i in range(count):
+        doc = copy.deepcopy(base)
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now - 3 * (count - i)))
+        doc['timestamp'] = doc['system_info']['collection_time'] = stamp
+        doc['cpu']['usage_percent'] = (i * 7) % 100
+        store.append('wsl', doc)
+
+
+def measure(root, query):
+    """Run in a fresh interpreter: (cold ms, warm ms, bytes, samples)"""
+    os.environ.update(PROJECT_ROOT=root, HISTORY_CACHE_WARM_HOURS='0', ENABLE_REPORTING='false')
+    import reporter
+    client = reporter.app.test_client()
+    url = '/api/historical/24?source=wsl' + query
+    start = time.perf_counter()
+    body = client.get(url).data
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    client.get(url)
+    warm = time.perf_counter() - start
+    print(json.dumps([cold * 1000, warm * 1000, len(body), len(json.loads(body))]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--samples', type=int, default=10000)
+    parser.add_argument('--measure', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    root = tempfile.mkdtemp(prefix='bench_fields_')
+    populate(root, args.samples)
+    for name, query in QUERIES.items():
+        output = subprocess.run([sys.executable, __file__, '--measure', root, query],
+                                capture_output=True, text=True, check=True).stdout
+        cold, warm, size, samples = json.loads(output.strip().splitlines()[-1])
+        print(f'{name:<26} {samples} samples, {size / 1024 ** 2:7.2f} MB, '
+              f'{cold:6.0f}ms cold / {warm:5.0f}ms warm')
+    shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
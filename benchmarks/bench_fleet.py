@@ -0,0 +1,90 @@
+"""
+Benchmark: /api/fleet over many pushing hosts
+
+Writes an hour of one-minute samples for --hosts hosts into a temporary
+history directory (as /api/ingest does), then times the fleet summary of
+cpu.usage_percent: cold (every sample parsed), warm (compact samples
+cached, statistics recomputed), a repeated request served from the
+response cache, and one right after a host pushed a new sample.
+
+Usage: python benchmarks/bench_fleet.py [--hosts N] [--minutes N]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+REPORTING = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'reporting')
+sys.path.insert(0, REPORTING)
+
+
+def sample(host, when):
+    """Canonical sample of one host"""
+    stamp = when.isoformat()
+    return {
+        'schema_version': 2,
+        'timestamp': stamp,
+        'system_info': {'hostname': host, 'platform': 'Linux', 'collection_time': stamp},
+        'cpu': {'usage_percent': random.uniform(0, 100), 'count': 8},
+        'memory': {'usage_percent': random.uniform(20, 90), 'swap_usage_percent': 1.0},
+        'disk': {'filesystems': []},
+        'network': {'interfaces': [{'rx_bytes': 10 ** 9, 'tx_bytes': 10 ** 8}]},
+        'gpu': {},
+        'system_load': {'load_average': {'1min': random.uniform(0, 8)}}
+    }
+
+
+def populate(root, hosts, minutes):
+    """Segments and manifests of every host, written directly for speed"""
+    from history_store import HistoryStore
+    from ingest import host_source
+    store = HistoryStore(os.path.join(root, 'data', 'metrics', 'history'))
+    start = datetime.now().replace(microsecond=0) - timedelta(minutes=minutes)
+    for n in range(hosts):
+        source = host_source(f'node{n:04d}')
+        for i in range(minutes):
+            store.append(source, sample(f'node{n:04d}', start + timedelta(minutes=i)))
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--hosts', type=int, default=500)
+    parser.add_argument('--minutes', type=int, default=60)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench_fleet_')
+    print(f'Writing {args.hosts} hosts x {args.minutes} samples to {root}')
+    populate(root, args.hosts, args.minutes)
+
+    os.environ.update(PROJECT_ROOT=root, HISTORY_CACHE_WARM_HOURS='0', ENABLE_REPORTING='false')
+    import reporter
+    client = reporter.app.test_client()
+    url = '/api/fleet?metric=cpu.usage_percent&window=1h'
+
+    cold, response = timed(lambda: client.get(url))
+    summary = response.get_json()
+    reporter.response_cache.clear()
+    warm, _ = timed(lambda: client.get(url))
+    cached, _ = timed(lambda: client.get(url))
+    revalidated, response = timed(lambda: client.get(url, headers={'If-None-Match': response.headers['ETag']}))
+    reporter.history_store.append('host-node0000', sample('node0000', datetime.now()))
+    pushed, _ = timed(lambda: client.get(url))
+
+    print(f"{summary['fleet']['hosts']} hosts, {summary['fleet']['samples']} samples, "
+          f"fleet p95 {summary['fleet']['p95']:.1f}, hottest {summary['top'][0]['host']}")
+    print(f'cold {cold * 1000:.0f}ms, warm {warm * 1000:.0f}ms, cached {cached * 1000:.0f}ms, '
+          f'304 {revalidated * 1000:.0f}ms ({response.status_code}), after a push {pushed * 1000:.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
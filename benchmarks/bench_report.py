@@ -0,0 +1,92 @@
+"""
+Benchmark: HTML report size and render time against the sampling rate
+
+Writes --hours of history at each of several sampling intervals into
+temporary history directories, using one document collected on this
+machine with its numeric fields varied, then reports the page size of
+/report/html and its render time: cold, with samples cached, and from the
+response cache. The report is built from bounded bucket series, so the
+page size stays the same however many samples there are.
+
+Usage: python benchmarks/bench_report.py [--hours N] [--intervals 60,10,3]
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+REPORTING = os.path.join(ROOT, 'reporting')
+sys.path.insert(0, REPORTING)
+sys.path.insert(0, ROOT)
+
+
+def populate(root, hours, interval):
+    """History of the wsl source, one sample every interval seconds, and its latest file"""
+    import monitor_linux
+    from schema import collector_output
+    from history_store import HistoryStore
+
+    base = collector_output(monitor_linux.collect_metrics())
+    store = HistoryStore(os.path.join(root, 'data', 'metrics', 'history'))
+    now = time.time()
+    count = int(hours * 3600 / interval)
+    for i in range(count):
+        doc = copy.deepcopy(base)
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now - interval * (count - i)))
+        doc['timestamp'] = doc['system_info']['collection_time'] = stamp
+        doc['cpu']['usage_percent'] = (i * 7) % 100
+        store.append('wsl', doc)
+    with open(os.path.join(root, 'data', 'metrics', 'latest_wsl.json'), 'w') as f:
+        json.dump(doc, f)
+    return count
+
+
+def measure(root):
+    """Run in a fresh interpreter: (cold ms, warm ms, cached ms, bytes) of /report/html"""
+    os.environ.update(PROJECT_ROOT=root, HISTORY_CACHE_WARM_HOURS='0', ENABLE_REPORTING='false')
+    import reporter
+    client = reporter.app.test_client()
+    start = time.perf_counter()
+    body = client.get('/report/html?source=wsl').data
+    cold = time.perf_counter() - start
+    reporter.response_cache.clear()
+    start = time.perf_counter()
+    client.get('/report/html?source=wsl')
+    warm = time.perf_counter() - start
+    start = time.perf_counter()
+    client.get('/report/html?source=wsl')
+    cached = time.perf_counter() - start
+    print(json.dumps([cold * 1000, warm * 1000, cached * 1000, len(body)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--intervals', default='60,10,3')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure)
+        return
+
+    for interval in (float(value) for value in args.intervals.split(',')):
+        root = tempfile.mkdtemp(prefix='bench_report_')
+        count = populate(root, args.hours, interval)
+        output = subprocess.run([sys.executable, __file__, '--measure', root],
+                                capture_output=True, text=True, check=True).stdout
+        cold, warm, cached, size = json.loads(output.strip().splitlines()[-1])
+        print(f'{count:>6} samples ({interval:g}s): {size / 1024:.0f} KB, '
+              f'render {cold:.0f}ms cold / {warm:.0f}ms samples cached / {cached:.1f}ms response cached')
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
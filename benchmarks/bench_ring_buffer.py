@@ -0,0 +1,118 @@
+"""
+Benchmark: recent-window loads from the ring buffer
+
+Appends --samples samples 3 s apart to a temporary history directory, then
+times loading the last 15 minutes as chart columns from the ring buffer and
+from the history store (cold and with the compact sample cache warm).
+
+With --stress, a second process writes records into a small ring as fast
+as it can while this one reads it, and every read is checked for torn or
+out-of-order rows.
+
+Usage: python benchmarks/bench_ring_buffer.py [--samples N] [--stress]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime, timedelta
+
+REPORTING = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'reporting')
+sys.path.insert(0, REPORTING)
+
+from ring_buffer import FIELDS, RingReader, append_record
+
+
+def sample(when, i):
+    stamp = when.isoformat()
+    return {
+        'schema_version': 2,
+        'timestamp': stamp,
+        'system_info': {'hostname': 'bench', 'platform': 'Linux', 'collection_time': stamp},
+        'cpu': {'usage_percent': i % 100},
+        'memory': {'usage_percent': 50.0, 'swap_usage_percent': 1.0},
+        'disk': {'filesystems': []},
+        'network': {'interfaces': [{'rx_bytes': i * 1000, 'tx_bytes': i * 100}]},
+        'gpu': {},
+        'system_load': {'load_average': {'1min': 1.0}}
+    }
+
+
+def best_of(func, runs=50):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_loads(count):
+    root = tempfile.mkdtemp(prefix='bench_ring_')
+    os.environ.update(PROJECT_ROOT=root, HISTORY_CACHE_WARM_HOURS='0', ENABLE_REPORTING='false')
+    import reporter
+
+    now = datetime.now().replace(microsecond=0)
+    for i in range(count):
+        reporter.history_store.append('windows', sample(now - timedelta(seconds=3 * (count - i)), i))
+
+    load = lambda: reporter.load_history_columns(0.25, 'windows')
+    ring = best_of(load)
+    ring_dir = os.path.dirname(reporter.history_store.ring_path('windows'))
+    shutil.rmtree(ring_dir)
+    reporter.ring_readers.clear()
+
+    def cold():
+        reporter.compact_cache.clear()
+        load()
+    parsed = best_of(cold, 5)
+    cached = best_of(load)
+    print(f'last 15 minutes of {count} samples: ring {ring:.2f}ms, '
+          f'history store {parsed:.2f}ms cold / {cached:.2f}ms cached')
+    shutil.rmtree(root)
+
+
+def _writer(path, count):
+    for i in range(1, count + 1):
+        append_record(path, float(i), [float(i)] * (FIELDS - 1), capacity=64)
+
+
+def stress(count=100000):
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_ring_'), 'stress.ring')
+    append_record(path, 0.5, [0.5] * (FIELDS - 1), capacity=64)
+    writer = multiprocessing.Process(target=_writer, args=(path, count))
+    writer.start()
+
+    reader = RingReader(path)
+    reads = torn = 0
+    while writer.is_alive():
+        result = reader.recent(0)
+        if result is None:
+            continue
+        epochs, columns, _ = result
+        reads += 1
+        # The writer stores the epoch in every field, so any mix of two writes shows
+        if (epochs[1:] <= epochs[:-1]).any() or (columns['cpu.usage_percent'] != epochs).any():
+            torn += 1
+    shutil.rmtree(os.path.dirname(path))
+    print(f'{reads} reads during {count} concurrent writes, {torn} inconsistent')
+    return torn == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--stress', action='store_true')
+    args = parser.parse_args()
+
+    bench_loads(args.samples)
+    if args.stress and not stress():
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: memory held by in-memory history samples
+
+Compares converted samples kept as nested dicts (what the parsed-sample cache
+holds) against the compact Sample objects the chart loader caches, and the
+HistoryColumns arrays built from them. Documents are parsed from JSON one by
+one, as the loader does, so no structure is shared between samples.
+
+Usage: python benchmarks/bench_sample_memory.py [sizes...]
+"""
+
+import os
+import sys
+import json
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'reporting'))
+
+from schema import to_canonical
+from columns import compact_sample, columns_from_samples
+
+
+def make_lines(count):
+    """History lines as written by monitor_windows.py, 3 s apart"""
+    start = datetime.now() - timedelta(seconds=3 * count)
+    lines = []
+    for i in range(count):
+        when = (start + timedelta(seconds=3 * i)).isoformat()
+        lines.append(json.dumps(to_canonical({
+            'timestamp': when,
+            'system': {'hostname': 'workstation', 'platform': 'Windows', 'version': '10.0.22631', 'architecture': 'AMD64'},
+            'cpu': {'usage_percent': random.uniform(0, 100), 'count': 16, 'frequency_mhz': 3600.0, 'temperature': 55.0},
+            'memory': {'total_gb': 31.9, 'used_gb': random.uniform(8, 30), 'available_gb': 10.2, 'percent': random.uniform(30, 95)},
+            'swap': {'total_gb': 4.0, 'used_gb': 0.5, 'percent': random.uniform(0, 20)},
+            'disk': [
+                {'device': 'C:\\', 'mountpoint': 'C:\\', 'total_gb': 951.6, 'used_gb': 612.3, 'free_gb': 339.3, 'percent': 64.3},
+                {'device': 'D:\\', 'mountpoint': 'D:\\', 'total_gb': 1863.0, 'used_gb': 1201.9, 'free_gb': 661.1, 'percent': 64.5}
+            ],
+            'network': {'bytes_sent_mb': 1024 + i * 0.01, 'bytes_recv_mb': 4096 + i * 0.05, 'packets_sent': 1000 + i, 'packets_recv': 4000 + i},
+            'gpu': {'available': True, 'name': 'NVIDIA GeForce RTX 4070', 'temperature': 48.0, 'utilization': random.uniform(0, 100),
+                    'memory_used_mb': 2048.0, 'memory_total_mb': 12282.0},
+            'system_load': {
+                'load_average': {'1min': random.uniform(0, 8), '5min': 2.0, '15min': 2.0},
+                'total_processes': 312, 'running_processes': 4, 'sleeping_processes': 300, 'zombie_processes': 0,
+                'top_cpu_processes': [
+                    {'name': f'process_{n}.exe', 'cpu_percent': random.uniform(0, 20), 'memory_percent': random.uniform(0, 5)}
+                    for n in range(5)
+                ],
+                'timestamp': when
+            }
+        })))
+    return lines
+
+
+def measure(build):
+    """Bytes still allocated by what build() returns"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000]
+    print(f"{'samples':>10} {'dicts':>10} {'Sample':>10} {'columns':>10} {'reduction':>10}")
+    for size in sizes:
+        lines = make_lines(size)
+        dicts = measure(lambda: [json.loads(line) for line in lines])
+        compact = measure(lambda: [compact_sample(json.loads(line)) for line in lines])
+        samples = [compact_sample(json.loads(line)) for line in lines]
+        columns = measure(lambda: columns_from_samples(samples))
+        print(f"{size:>10} {dicts / 2**20:>8.1f}MB {compact / 2**20:>8.1f}MB {columns / 2**20:>8.1f}MB "
+              f"{dicts / compact:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: startup time of the reporter and the collectors
+
+Starts every entry point in a fresh interpreter with -X importtime (the
+same output as PYTHONPROFILEIMPORTTIME=1) and reports the best wall time
+over several runs, the import time of the entry module, and its slowest
+direct imports. With --check, exits non-zero when an entry point is over
+its budget in STARTUP_BUDGET_MS, so import-time regressions get caught.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--check] [entry points...]
+"""
+
+import os
+import sys
+import time
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Entry point -> (working directory, module imported at startup)
+ENTRY_POINTS = {
+    'reporter': ('reporting', 'reporter'),
+    'monitor_linux': ('.', 'monitor_linux'),
+    'monitor_mac': ('.', 'monitor_mac'),
+    'monitor_windows': ('.', 'monitor_windows'),
+}
+
+# Import-time budgets in milliseconds, with headroom for slower machines
+STARTUP_BUDGET_MS = {
+    'reporter': 600,
+    'monitor_linux': 150,
+    'monitor_mac': 150,
+    'monitor_windows': 150,
+}
+
+
+def run_once(name):
+    """Wall time and -X importtime lines of one fresh start of an entry point"""
+    cwd, module = ENTRY_POINTS[name]
+    env = dict(os.environ, HISTORY_CACHE_WARM_HOURS='0', ENABLE_REPORTING='false')
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.join(ROOT, cwd), env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f'{name} failed to import:\n{result.stderr[-2000:]}')
+    return elapsed, result.stderr.splitlines()
+
+
+def parse_importtime(lines, module):
+    """(cumulative us of module, [(cumulative us, name)] of its direct imports)"""
+    rows = []
+    for line in lines:
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((depth, int(cumulative), name.strip()))
+
+    # -X importtime prints children before their parent
+    total = 0
+    children = []
+    pending = []
+    for depth, cumulative, name in rows:
+        if depth == 0 and name == module:
+            total = cumulative
+            children = [(c, n) for d, c, n in pending if d == 1]
+            pending = []
+        elif depth == 0:
+            pending = []
+        else:
+            pending.append((depth, cumulative, name))
+    return total, sorted(children, reverse=True)
+
+
+def main():
+    args = sys.argv[1:]
+    runs = 5
+    if '--runs' in args:
+        pos = args.index('--runs')
+        runs = int(args[pos + 1])
+        del args[pos:pos + 2]
+    check = '--check' in args
+    names = [arg for arg in args if not arg.startswith('--')] or list(ENTRY_POINTS)
+
+    over_budget = []
+    print(f"{'entry point':<18} {'startup':>9} {'import':>9} {'budget':>8}  slowest imports")
+    for name in names:
+        best = float('inf')
+        for _ in range(runs):
+            elapsed, lines = run_once(name)
+            if elapsed < best:
+                best, best_lines = elapsed, lines
+        total, children = parse_importtime(best_lines, ENTRY_POINTS[name][1])
+        budget = STARTUP_BUDGET_MS.get(name)
+        slowest = ', '.join(f'{n} {c / 1000:.0f}ms' for c, n in children[:4])
+        print(f'{name:<18} {best * 1000:>7.0f}ms {total / 1000:>7.0f}ms {budget:>6}ms  {slowest}')
+        if budget is not None and total / 1000 > budget:
+            over_budget.append(name)
+
+    if check and over_budget:
+        print(f"Over budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
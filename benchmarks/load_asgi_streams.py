@@ -0,0 +1,167 @@
+"""
+Load test: many idle /api/stream clients plus steady polling
+
+Opens --streams Server-Sent Events connections that stay idle, then has
+--pollers clients request /api/latest and /api/charts/data every
+--interval seconds for --duration seconds. Reports how many streams are
+still open at the end and the polling latency, and exits non-zero if any
+stream dropped or any poll failed.
+
+With --spawn the ASGI reporter is started with uvicorn for the run:
+
+    python benchmarks/load_asgi_streams.py --spawn
+    python benchmarks/load_asgi_streams.py --url http://localhost:8080 --streams 1000
+
+Usage: python benchmarks/load_asgi_streams.py [--url URL] [--streams N] [--pollers N]
+                                              [--interval S] [--duration S] [--spawn]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import resource
+import subprocess
+from urllib.parse import urlsplit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+POLL_PATHS = ('/api/latest', '/api/charts/data')
+
+
+async def request(host, port, path, headers=''):
+    """Status and body of one GET on a fresh connection"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n{headers}\r\n'.encode('latin-1'))
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    status = int(response.split(b' ', 2)[1]) if response.startswith(b'HTTP/') else 0
+    return status, response
+
+
+async def open_stream(host, port, stats):
+    """Open one /api/stream connection and keep reading it until cancelled"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f'GET /api/stream HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n'.encode('latin-1'))
+        await writer.drain()
+        status_line = await reader.readline()
+        if b' 200 ' not in status_line:
+            stats['failed'] += 1
+            writer.close()
+            return
+    except OSError:
+        stats['failed'] += 1
+        return
+
+    stats['open'] += 1
+    try:
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            stats['events'] += chunk.count(b'event: sample')
+    except (OSError, asyncio.CancelledError):
+        pass
+    finally:
+        stats['open'] -= 1
+        writer.close()
+
+
+async def poller(host, port, interval, deadline, latencies, errors):
+    """Poll the JSON endpoints until the deadline, revalidating with ETags like a browser"""
+    etags = {}
+    turn = 0
+    while time.monotonic() < deadline:
+        path = POLL_PATHS[turn % len(POLL_PATHS)]
+        turn += 1
+        headers = f'If-None-Match: {etags[path]}\r\n' if path in etags else ''
+        start = time.perf_counter()
+        try:
+            status, response = await request(host, port, path, headers)
+        except OSError:
+            errors.append(path)
+        else:
+            latencies.append(time.perf_counter() - start)
+            if status not in (200, 304, 404):
+                errors.append(f'{path} {status}')
+            for line in response.split(b'\r\n\r\n', 1)[0].split(b'\r\n'):
+                if line.lower().startswith(b'etag:'):
+                    etags[path] = line.split(b':', 1)[1].strip().decode('latin-1')
+        await asyncio.sleep(interval)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+
+async def run(args):
+    parts = urlsplit(args.url)
+    host, port = parts.hostname, parts.port or 80
+    stats = {'open': 0, 'failed': 0, 'events': 0}
+
+    streams = []
+    for start in range(0, args.streams, 100):
+        streams += [asyncio.ensure_future(open_stream(host, port, stats))
+                    for _ in range(min(100, args.streams - start))]
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(1)
+    print(f'{stats["open"]} streams open, {stats["failed"]} failed to connect')
+
+    latencies, errors = [], []
+    deadline = time.monotonic() + args.duration
+    await asyncio.gather(*[poller(host, port, args.interval, deadline, latencies, errors)
+                           for _ in range(args.pollers)])
+
+    still_open = stats['open']
+    for stream in streams:
+        stream.cancel()
+    await asyncio.gather(*streams, return_exceptions=True)
+
+    print(f'{still_open}/{args.streams} streams still open after {args.duration:.0f}s, '
+          f'{stats["events"]} sample events received')
+    print(f'{len(latencies)} polls, {len(errors)} errors, latency p50 {percentile(latencies, 0.5) * 1000:.1f}ms '
+          f'p95 {percentile(latencies, 0.95) * 1000:.1f}ms max {max(latencies, default=0) * 1000:.1f}ms')
+    return still_open == args.streams and not errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--streams', type=int, default=1000)
+    parser.add_argument('--pollers', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--spawn', action='store_true', help='start the ASGI reporter with uvicorn')
+    args = parser.parse_args()
+
+    # Every stream is a socket on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = 2 * args.streams + 1024
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+    server = None
+    if args.spawn:
+        port = urlsplit(args.url).port or 80
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'reporter_asgi:app', '--app-dir', 'reporting',
+             '--port', str(port), '--log-level', 'warning', '--backlog', str(args.streams + 128)],
+            cwd=ROOT
+        )
+        time.sleep(3)
+    try:
+        ok = asyncio.run(run(args))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -57,7 +57,7 @@ install_dependencies() {
             fi
             
             # Install Python packages
-            pip3 install flask jinja2 markdown plotly pandas
+            pip3 install flask jinja2 markdown plotly numpy
             ;;
             
         macos)
@@ -69,14 +69,14 @@ install_dependencies() {
             fi
             
             brew install bash coreutils python3 dialog smartmontools
-            pip3 install flask jinja2 markdown plotly pandas
+            pip3 install flask jinja2 markdown plotly numpy
             ;;
             
         windows)
             echo -e "${YELLOW}On Windows, please ensure you have Git Bash or WSL installed${NC}"
             echo -e "${YELLOW}Python 3 and pip should be installed manually${NC}"
             
-            pip3 install flask jinja2 markdown plotly pandas
+            pip3 install flask jinja2 markdown plotly numpy
             ;;
     esac
     
@@ -5,12 +5,19 @@ Collects system metrics using macOS-specific tools and libraries
 """
 
 import os
+import sys
 import json
 import platform
 import subprocess
 from datetime import datetime
 from pathlib import Path
 
+# History store is shared with the reporter
+sys.path.insert(0, str(Path(__file__).parent / 'reporting'))
+from history_store import HistoryStore
+from schema import collector_output
+from push import push_metrics
+
 try:
     import psutil
 except ImportError:
@@ -300,14 +307,27 @@ def save_metrics(metrics, filename='latest_mac.json'):
     print(f"\nMetrics saved to: {filepath}")
 
 
+def save_history(metrics):
+    """Append metrics to the hourly history segment"""
+    history_dir = Path(__file__).parent / 'data' / 'metrics' / 'history'
+    HistoryStore(str(history_dir)).append('mac', metrics)
+
+
 if __name__ == '__main__':
     try:
         metrics = collect_metrics()
         print_metrics(metrics)
+        
+        # Written in the reporter's schema so it never has to convert it
+        metrics = collector_output(metrics)
         save_metrics(metrics)
         
         # Also save as latest.json for backward compatibility
         save_metrics(metrics, 'latest.json')
+        save_history(metrics)
+        
+        # Sent to a remote reporter when METRICS_PUSH_URL is set
+        push_metrics(json.dumps(metrics), str(Path(__file__).parent / 'data' / 'metrics' / 'push_spool.ndjson'))
         
         print("\nJSON Output:")
         print(json.dumps(metrics, indent=2))
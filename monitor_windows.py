@@ -3,12 +3,20 @@ Simple System Monitor Test - Windows Compatible
 Works on Windows without Bash or complex dependencies
 """
 
+import os
+import sys
 import platform
 import psutil
 import json
 import subprocess
 from datetime import datetime
 
+# History store is shared with the reporter
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reporting'))
+from history_store import HistoryStore
+from schema import collector_output
+from push import push_metrics
+
 def get_cpu_temperature():
     """Get CPU temperature from LibreHardwareMonitor WMI"""
     try:
@@ -245,10 +253,12 @@ def print_metrics(metrics):
 def save_metrics(metrics, filename='data/metrics/latest_windows.json'):
     """Save metrics to JSON file and history"""
     import os
-    from datetime import datetime
     
     os.makedirs(os.path.dirname(filename), exist_ok=True)
     
+    # Written in the reporter's schema so it never has to convert it
+    metrics = collector_output(metrics)
+    
     # Save latest metrics
     with open(filename, 'w') as f:
         json.dump(metrics, f, indent=2)
@@ -257,13 +267,11 @@ def save_metrics(metrics, filename='data/metrics/latest_windows.json'):
     with open('data/metrics/latest.json', 'w') as f:
         json.dump(metrics, f, indent=2)
     
-    # Save to history with timestamp
-    history_dir = 'data/metrics/history'
-    os.makedirs(history_dir, exist_ok=True)
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    history_file = os.path.join(history_dir, f'windows_metrics_{timestamp}.json')
-    with open(history_file, 'w') as f:
-        json.dump(metrics, f, indent=2)
+    # Append to the hourly history segment
+    HistoryStore('data/metrics/history').append('windows', metrics)
+    
+    # Sent to a remote reporter when METRICS_PUSH_URL is set
+    push_metrics(json.dumps(metrics), 'data/metrics/push_spool.ndjson')
     
     print(f"\n✅ Metrics saved to: {filename}")
 
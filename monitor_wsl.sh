@@ -520,15 +520,31 @@ echo "}"
 
 # Save formatted JSON (with error handling)
 mkdir -p data/metrics 2>/dev/null
-mkdir -p data/metrics/history 2>/dev/null
+mkdir -p data/metrics/history/segments/wsl 2>/dev/null
+mkdir -p data/metrics/history/index 2>/dev/null
 
 if [ -f /tmp/monitor_output.json ]; then
     # Save to latest file
     cp /tmp/monitor_output.json data/metrics/latest_wsl.json 2>/dev/null
     
-    # Save to history with timestamp
-    TIMESTAMP=$(date +"%Y%m%d_%H%M%S")
-    cp /tmp/monitor_output.json "data/metrics/history/wsl_metrics_${TIMESTAMP}.json" 2>/dev/null
+    # Append to the hourly history segment as one compact line
+    EPOCH=$(date +%s)
+    SEGMENT_NAME="$(date -d "@$EPOCH" +"%Y%m%d_%H").ndjson"
+    SEGMENT="data/metrics/history/segments/wsl/${SEGMENT_NAME}"
+    OFFSET=$(stat -c %s "$SEGMENT" 2>/dev/null || echo 0)
+    { tr -d '\n' < /tmp/monitor_output.json; echo; } >> "$SEGMENT" 2>/dev/null
+    
+    # Record the sample in the time index: epoch, segment, byte offset. The index
+    # lock keeps the line from being lost while compaction rewrites the index
+    (
+        flock 9 2>/dev/null
+        printf '%s\tsegments/wsl/%s\t%s\n' "$EPOCH" "$SEGMENT_NAME" "$OFFSET" >> data/metrics/history/index/wsl.tsv 2>/dev/null
+    ) 9>> data/metrics/history/index/wsl.lock
+
+    # Fold the sample into the 1m/5m/1h rollups long report and chart windows are read from
+    if [ -f reporting/rollups.py ]; then
+        python3 reporting/rollups.py data/metrics/history wsl "$EPOCH" < /tmp/monitor_output.json 2>/dev/null
+    fi
 fi
 
 echo -e "${BOLD}${GREEN}✅ Complete! Metrics saved to data/metrics/latest_wsl.json${NC}"
\ No newline at end of file
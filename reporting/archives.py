@@ -0,0 +1,106 @@
+"""
+System Monitor History Archives
+Gzip'd daily history files made of independently readable blocks
+"""
+
+import os
+import json
+import zlib
+
+# Closed days live under history/archive/<source>/YYYYMMDD.<generation>.ndjson.gz,
+# written by compact_history.py. Every block of up to ARCHIVE_BLOCK_SAMPLES
+# lines is a gzip member of its own, so one sample is read by decompressing
+# one block. A sample's index offset is block_offset * ARCHIVE_BLOCK_SAMPLES + line.
+ARCHIVE_DIR = 'archive'
+ARCHIVE_SUFFIX = '.ndjson.gz'
+ARCHIVE_DAY_FORMAT = '%Y%m%d'
+ARCHIVE_BLOCK_SAMPLES = 256
+
+# Block index next to each archive: "<first epoch>\t<last epoch>\t<offset>\t<length>\t<lines>"
+BLOCK_INDEX_SUFFIX = '.blocks.tsv'
+
+READ_CHUNK = 64 * 1024
+
+
+def is_archive(path):
+    return path.endswith(ARCHIVE_SUFFIX)
+
+
+def block_index_path(path):
+    return path[:-len(ARCHIVE_SUFFIX)] + BLOCK_INDEX_SUFFIX
+
+
+def encode_offset(block_offset, line):
+    return block_offset * ARCHIVE_BLOCK_SAMPLES + line
+
+
+def decode_offset(offset):
+    """(block offset, line within the block) of an archive index offset"""
+    return divmod(offset, ARCHIVE_BLOCK_SAMPLES)
+
+
+def _gzip_member(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def write_archive(path, samples):
+    """Write (epoch, line) pairs sorted by epoch as an archive and its block index
+
+    The files are written under temporary names and renamed into place.
+    Returns the (epoch, offset) index entries of the samples.
+    """
+    entries = []
+    blocks = []
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        for start in range(0, len(samples), ARCHIVE_BLOCK_SAMPLES):
+            block = samples[start:start + ARCHIVE_BLOCK_SAMPLES]
+            offset = f.tell()
+            f.write(_gzip_member(b''.join(line for _, line in block)))
+            blocks.append((block[0][0], block[-1][0], offset, f.tell() - offset, len(block)))
+            entries.extend((epoch, encode_offset(offset, n)) for n, (epoch, _) in enumerate(block))
+        f.flush()
+        os.fsync(f.fileno())
+
+    index_tmp = block_index_path(path) + '.tmp'
+    with open(index_tmp, 'w') as f:
+        for first, last, offset, length, count in blocks:
+            f.write(f'{first:.6f}\t{last:.6f}\t{offset}\t{length}\t{count}\n')
+    os.replace(index_tmp, block_index_path(path))
+    os.replace(tmp, path)
+    return entries
+
+
+def read_block(f, block_offset):
+    """Lines of the block starting at block_offset of an open archive"""
+    f.seek(block_offset)
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = b''
+    while not decompressor.eof:
+        chunk = f.read(READ_CHUNK)
+        if not chunk:
+            break
+        data += decompressor.decompress(chunk)
+    return data.splitlines(keepends=True)
+
+
+def read_blocks(path):
+    """(offset, length) of every block, from the block index"""
+    with open(block_index_path(path)) as f:
+        return [(int(offset), int(length)) for _, _, offset, length, _ in
+                (line.rstrip('\n').split('\t') for line in f if line.endswith('\n'))]
+
+
+def scan_archive(path, epoch_of):
+    """Yield (epoch, offset) of every sample of an archive, epoch_of(line) giving its time"""
+    with open(path, 'rb') as f:
+        for offset, length in read_blocks(path):
+            f.seek(offset)
+            lines = zlib.decompress(f.read(length), 16 + zlib.MAX_WBITS).splitlines()
+            for n, line in enumerate(lines):
+                try:
+                    epoch = epoch_of(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    continue
+                yield epoch, encode_offset(offset, n)
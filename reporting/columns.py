@@ -0,0 +1,182 @@
+"""
+System Monitor History Columns
+Single-pass extraction of converted history samples into NumPy column arrays
+"""
+
+import time
+from array import array
+from datetime import datetime
+
+import numpy as np
+
+from history_store import parse_timestamp
+from fields import COLUMN_NAMES, column_row, column_values
+
+
+class Sample:
+    """One history sample reduced to its chart columns
+
+    `values` is a float64 array in COLUMN_NAMES order. A few hundred bytes
+    instead of the nested dicts of a converted sample.
+    """
+
+    __slots__ = ('timestamp', 'epoch', 'values')
+
+    def __init__(self, timestamp, epoch, values):
+        self.timestamp = timestamp
+        self.epoch = epoch
+        self.values = values
+
+
+def compact_sample(data, epoch=None):
+    """Sample holding the COLUMN_NAMES fields of a converted sample
+
+    epoch is used when the collection time cannot be parsed.
+    """
+    values = column_values(data)
+    timestamp = data['system_info']['collection_time']
+    try:
+        epoch = parse_timestamp(timestamp).timestamp()
+    except (ValueError, TypeError):
+        epoch = float('nan') if epoch is None else epoch
+    return Sample(timestamp, epoch, values)
+
+
+class HistoryColumns:
+    """Struct-of-arrays view of a history window
+
+    `timestamps` keeps the ISO labels for chart axes, `epochs` the same
+    instants as float seconds, and every numeric field is a float64 array
+    (NaN where a sample lacks the field).
+    """
+
+    def __init__(self, timestamps, epochs, columns):
+        self.timestamps = timestamps
+        self.epochs = epochs
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.epochs)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def labels(self, indices):
+        """ISO timestamp labels at the given indices"""
+        return [self.timestamps[i] for i in indices]
+
+    def local_ms(self):
+        """Epoch milliseconds shifted to local wall time
+
+        Plotly renders numeric dates in UTC, so shifting by the UTC offset
+        shows the same times as the ISO labels.
+        """
+        if not len(self.epochs):
+            return self.epochs * 1000
+        first = time.localtime(self.epochs[0]).tm_gmtoff
+        last = time.localtime(self.epochs[-1]).tm_gmtoff
+        if first == last:
+            offsets = first
+        else:
+            offsets = np.array([time.localtime(epoch).tm_gmtoff for epoch in self.epochs])
+        return (self.epochs + offsets) * 1000
+
+
+def _epochs(timestamps):
+    """Epoch seconds for ISO timestamp labels, vectorized for naive local times"""
+    count = len(timestamps)
+    if count and all('+' not in t[10:] and not t.endswith('Z') for t in (timestamps[0], timestamps[-1])):
+        try:
+            first = parse_timestamp(timestamps[0]).timestamp()
+            last = parse_timestamp(timestamps[-1]).timestamp()
+            naive = np.array(timestamps, dtype='datetime64[us]').astype(np.int64) / 1e6
+            # Same UTC offset at both ends: no DST change inside the window
+            offset = first - naive[0]
+            if abs((last - naive[-1]) - offset) < 1e-3:
+                return naive + offset
+        except (ValueError, TypeError):
+            pass
+
+    epochs = np.empty(count, dtype=np.float64)
+    for i, timestamp in enumerate(timestamps):
+        try:
+            epochs[i] = parse_timestamp(timestamp).timestamp()
+        except (ValueError, TypeError):
+            epochs[i] = epochs[i - 1] + 1 if i else 0.0
+    return epochs
+
+
+def build_columns(historical_data, names=None):
+    """Extract timestamps and numeric fields from converted samples in one pass
+
+    Every sample is walked once for all columns; only samples missing a
+    field take the per-field extractors.
+    """
+    names = list(names or COLUMN_NAMES)
+    timestamps = []
+    flat = array('d')
+    append, extend = timestamps.append, flat.extend
+    for data in historical_data:
+        append(data['system_info']['collection_time'])
+        try:
+            extend(column_row(data))
+        except (KeyError, TypeError, ValueError, IndexError):
+            extend(column_values(data))
+
+    matrix = np.frombuffer(flat, dtype=np.float64).reshape(len(timestamps), len(COLUMN_NAMES))
+    columns = {name: matrix[:, COLUMN_NAMES.index(name)].copy() for name in names}
+    return HistoryColumns(timestamps, _epochs(timestamps), columns)
+
+
+def columns_from_samples(samples, names=None):
+    """HistoryColumns of compact samples, without touching any nested document"""
+    names = list(names or COLUMN_NAMES)
+    count = len(samples)
+    flat = array('d')
+    for sample in samples:
+        flat.extend(sample.values)
+    matrix = np.frombuffer(flat, dtype=np.float64).reshape(count, len(COLUMN_NAMES))
+
+    epochs = np.fromiter((sample.epoch for sample in samples), dtype=np.float64, count=count)
+    columns = {name: matrix[:, COLUMN_NAMES.index(name)].copy() for name in names}
+    return HistoryColumns([sample.timestamp for sample in samples], epochs, columns)
+
+
+def _labels(epochs):
+    """Local ISO timestamp labels of epoch seconds, vectorized when no DST change is inside"""
+    if not len(epochs):
+        return []
+    first = time.localtime(epochs[0]).tm_gmtoff
+    if first != time.localtime(epochs[-1]).tm_gmtoff:
+        return [datetime.fromtimestamp(epoch).isoformat() for epoch in epochs.tolist()]
+    unit = 's' if np.all(epochs == np.floor(epochs)) else 'us'
+    local = ((epochs + first) * 1e6).round().astype('datetime64[us]')
+    return np.datetime_as_string(local, unit=unit).tolist()
+
+
+def columns_from_arrays(epochs, columns):
+    """HistoryColumns over existing arrays, e.g. views of a ring buffer; labels are made from the epochs"""
+    return HistoryColumns(_labels(epochs), epochs, columns)
+
+
+def interleave_columns(first, second, shift):
+    """HistoryColumns alternating the samples of two aligned windows, second's shifted by shift seconds"""
+    epochs = np.empty(2 * len(first))
+    epochs[0::2] = first.epochs
+    epochs[1::2] = second.epochs + shift
+    columns = {}
+    for name in first.columns:
+        values = np.empty(len(epochs))
+        values[0::2] = first[name]
+        values[1::2] = second[name]
+        columns[name] = values
+    return columns_from_arrays(epochs, columns)
+
+
+def concat_columns(first, second):
+    """HistoryColumns of two consecutive windows"""
+    if not len(first):
+        return second
+    columns = {name: np.concatenate((first[name], second[name])) for name in second.columns}
+    return HistoryColumns(first.timestamps + second.timestamps,
+                          np.concatenate((first.epochs, second.epochs)), columns)
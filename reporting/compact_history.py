@@ -0,0 +1,212 @@
+"""
+System Monitor History Compaction
+Merges closed days of history into gzip'd archives and applies retention
+
+Raw samples of every day that ended more than COMPACT_GRACE ago (hourly
+segments and legacy per-sample files alike) are rewritten as one archive
+per source and day, and the time index is pointed at the archive. Raw days
+older than --raw-days are dropped; the rollup tiers are gzip'd per day and
+kept for their own, longer retention, so long windows still have data.
+
+Usage: python reporting/compact_history.py [--history-dir DIR] [--raw-days N]
+                                           [--rollup-days 1m=30,5m=180,1h=730]
+"""
+
+import os
+import sys
+import json
+import gzip
+import argparse
+from datetime import datetime, date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from history_store import HistoryStore, LEGACY_SUFFIX
+from archives import ARCHIVE_SUFFIX, is_archive, block_index_path, write_archive
+from rollups import TIERS, DAY_FORMAT, DAY_SUFFIX, COMPRESSED_SUFFIX, locked_day_file
+
+RAW_RETENTION_DAYS = 30
+ROLLUP_RETENTION_DAYS = {'1m': 30, '5m': 180, '1h': 730}
+
+# Samples of a day may still be written shortly after midnight
+COMPACT_GRACE = timedelta(hours=1)
+
+# First day the time index can hold, as lookup() start
+INDEX_START = datetime(1970, 1, 2)
+
+
+def history_sources(store):
+    """Sources with a time index or legacy per-sample files"""
+    sources = set(store.sources())
+    try:
+        names = os.listdir(store.history_dir)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        if name.endswith(LEGACY_SUFFIX) and '_metrics_' in name:
+            sources.add(name.split('_metrics_', 1)[0])
+    return sorted(sources)
+
+
+def _archive_generation(path):
+    """Generation number of an archive path, -1 for anything else"""
+    try:
+        return int(os.path.basename(path)[:-len(ARCHIVE_SUFFIX)].split('.', 1)[1])
+    except (IndexError, ValueError):
+        return -1
+
+
+def archive_day(store, source, day, entries):
+    """Write the samples of index entries as the archive of one day; returns its index entries"""
+    samples = []
+    for entry, data in store.read_entries(entries):
+        samples.append((entry[0], json.dumps(data, separators=(',', ':')).encode('utf-8') + b'\n'))
+    if not samples:
+        return []
+    samples.sort(key=lambda sample: sample[0])
+
+    generation = max(_archive_generation(entry[1]) for entry in entries) + 1
+    path = store.archive_path(source, day, generation)
+    while os.path.exists(path):
+        generation += 1
+        path = store.archive_path(source, day, generation)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return [(epoch, path, offset) for epoch, offset in write_archive(path, samples)]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    if is_archive(path):
+        _remove(block_index_path(path))
+
+
+def compact_source(store, source, closed_before, expire_before):
+    """Archive closed days of a source and drop expired ones; returns (archived, expired) day counts
+
+    closed_before and expire_before are dates: days before the first are
+    archived, days before the second removed.
+    """
+    with store.manifest_lock(source):
+        entries = store.lookup(source, INDEX_START)
+        days = {}
+        for entry in entries:
+            day = date.fromtimestamp(entry[0])
+            if day >= closed_before:
+                break
+            days.setdefault(day, []).append(entry)
+
+        replaced = {}
+        for day, day_entries in days.items():
+            if day < expire_before:
+                replaced[day] = []
+            elif len({entry[1] for entry in day_entries}) > 1 or not is_archive(day_entries[0][1]):
+                replaced[day] = archive_day(store, source, day, day_entries)
+        if not replaced:
+            return 0, 0
+
+        # Legacy files of open days stay out of the manifest; they are still indexed from the directory
+        kept = [entry for entry in entries
+                if date.fromtimestamp(entry[0]) not in replaced and entry[2] >= 0]
+        archived = [entry for day_entries in replaced.values() for entry in day_entries]
+        manifest = sorted(kept + archived)
+        store.write_manifest(source, manifest)
+
+        # Only after the index no longer points at them
+        live = {entry[1] for entry in manifest}
+        for path in {entry[1] for day in replaced for entry in days[day]} - live:
+            _remove(path)
+
+    expired = sum(1 for day in replaced if day < expire_before)
+    return len(replaced) - expired, expired
+
+
+def compact_rollups(store, source, closed_before, retention):
+    """Gzip closed rollup days of a source and drop those past their tier's retention
+
+    A plain day file next to a gzip'd one holds buckets closed late; the
+    two are merged. Returns the number of files written or removed.
+    """
+    changed = 0
+    for tier, _ in TIERS:
+        tier_dir = os.path.join(store.rollups.rollups_dir, tier, source)
+        try:
+            names = sorted(os.listdir(tier_dir))
+        except FileNotFoundError:
+            continue
+        keep_days = retention.get(tier)
+        for name in names:
+            try:
+                day = datetime.strptime(name[:8], DAY_FORMAT).date()
+            except ValueError:
+                continue
+            path = os.path.join(tier_dir, name)
+            if keep_days is not None and day < closed_before - timedelta(days=keep_days):
+                _remove(path)
+                changed += 1
+            elif name.endswith(DAY_SUFFIX) and day < closed_before:
+                _compress_rollup_day(path)
+                changed += 1
+    return changed
+
+
+def _compress_rollup_day(path):
+    compressed = path + COMPRESSED_SUFFIX
+    # Held until the plain file is removed, so a bucket the rollup writer closes
+    # meanwhile goes either into this file before it is read or into a new one
+    with locked_day_file(path, 'rb') as day:
+        data = b''
+        if os.path.exists(compressed):
+            with gzip.open(compressed, 'rb') as f:
+                data = f.read()
+        data += day.read()
+        tmp = compressed + '.tmp'
+        with gzip.open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, compressed)
+        os.remove(path)
+
+
+def compact(history_dir, raw_days=RAW_RETENTION_DAYS, rollup_days=None, now=None):
+    """Compact every source of a history directory; returns {source: (archived, expired, rollup files)}"""
+    store = HistoryStore(history_dir)
+    closed_before = ((now or datetime.now()) - COMPACT_GRACE).date()
+    expire_before = closed_before - timedelta(days=raw_days)
+    retention = ROLLUP_RETENTION_DAYS if rollup_days is None else rollup_days
+
+    results = {}
+    for source in history_sources(store):
+        archived, expired = compact_source(store, source, closed_before, expire_before)
+        results[source] = (archived, expired, compact_rollups(store, source, closed_before, retention))
+    return results
+
+
+def parse_rollup_days(value):
+    """{tier: days} from "1m=30,5m=180,1h=730"; 0 or a missing tier keeps forever"""
+    retention = {}
+    for part in filter(None, value.split(',')):
+        tier, days = part.split('=')
+        retention[tier.strip()] = int(days) or None
+    return retention
+
+
+def main():
+    project_root = os.getenv('PROJECT_ROOT', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--history-dir', default=os.path.join(project_root, 'data', 'metrics', 'history'))
+    parser.add_argument('--raw-days', type=int, default=RAW_RETENTION_DAYS)
+    parser.add_argument('--rollup-days', type=parse_rollup_days,
+                        default=','.join(f'{tier}={days}' for tier, days in ROLLUP_RETENTION_DAYS.items()))
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.history_dir):
+        return
+    for source, (archived, expired, rollups) in compact(args.history_dir, args.raw_days, args.rollup_days).items():
+        if archived or expired or rollups:
+            print(f'{source}: {archived} days archived, {expired} days expired, {rollups} rollup files compacted')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+System Monitor Downsampling
+Shape-preserving Largest-Triangle-Three-Buckets (LTTB) reduction of chart series
+"""
+
+import numpy as np
+
+
+def lttb_indices(xs, ys, max_points):
+    """Return the indices of at most max_points samples that preserve the series shape
+
+    The first and last samples are always kept. Every bucket in between keeps
+    the sample forming the largest triangle with the previously kept sample
+    and the average of the next bucket, so spikes survive the reduction.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    n = len(ys)
+    if max_points is None or max_points <= 0 or n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1][:max_points])
+
+    # Bucket k spans bounds[k]:bounds[k + 1]; first and last samples stay outside
+    every = (n - 2) / (max_points - 2)
+    bounds = (np.arange(max_points - 1) * every).astype(np.intp) + 1
+    bounds[-1] = n - 1
+
+    # Average of every bucket's successor in one pass; the last bucket's is the last sample
+    sizes = np.diff(bounds)
+    avg_xs = (np.add.reduceat(xs[:-1], bounds[:-1]) / sizes).tolist()[1:] + [xs[-1]]
+    avg_ys = (np.add.reduceat(ys[:-1], bounds[:-1]) / sizes).tolist()[1:] + [ys[-1]]
+
+    # The kept sample of each bucket depends on the previous one, so the
+    # buckets are scanned in order; plain floats beat numpy on slices this small
+    x_list = xs.tolist()
+    y_list = ys.tolist()
+    bounds = bounds.tolist()
+    indices = np.empty(max_points, dtype=np.intp)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+
+    for i in range(max_points - 2):
+        start, end = bounds[i], bounds[i + 1]
+        avg_x, avg_y = avg_xs[i], avg_ys[i]
+        ax, ay = x_list[a], y_list[a]
+        dx, dy = ax - avg_x, avg_y - ay
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs(dx * (y_list[j] - ay) - (ax - x_list[j]) * dy)
+            # NaN areas (gaps in the series) never win
+            if area > best_area:
+                best, best_area = j, area
+        a = best
+        indices[i + 1] = a
+
+    return indices
+
+
+def downsample(xs, ys, max_points, labels=None):
+    """Reduce a series with LTTB, returning (labels or xs, ys) as lists
+
+    labels lets callers keep display values (e.g. timestamp strings) while
+    the triangle areas are computed on numeric xs.
+    """
+    indices = lttb_indices(xs, ys, max_points)
+    source = labels if labels is not None else np.asarray(xs).tolist()
+    return [source[i] for i in indices], np.asarray(ys, dtype=np.float64)[indices].tolist()
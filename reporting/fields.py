@@ -0,0 +1,78 @@
+"""
+System Monitor Chart Fields
+The numeric fields charts are drawn from, extracted without NumPy so collectors can use them
+"""
+
+from array import array
+
+
+def _network_mb(data, key):
+    interfaces = data['network']['interfaces']
+    if len(interfaces) == 1:
+        return int(interfaces[0][key]) / (1024**2)
+    return sum(int(iface[key]) for iface in interfaces) / (1024**2)
+
+
+# Column name -> extractor over a converted sample
+COLUMN_EXTRACTORS = {
+    'cpu.usage_percent': lambda data: data['cpu']['usage_percent'],
+    'memory.usage_percent': lambda data: data['memory']['usage_percent'],
+    'memory.swap_usage_percent': lambda data: data['memory']['swap_usage_percent'],
+    'disk.max_usage_percent': lambda data: max(float(fs['usage_percent']) for fs in data['disk']['filesystems']),
+    'network.rx_mb': lambda data: _network_mb(data, 'rx_bytes'),
+    'network.tx_mb': lambda data: _network_mb(data, 'tx_bytes'),
+    'gpu.utilization_percent': lambda data: data['gpu']['gpu']['utilization_percent'],
+    'system_load.1min': lambda data: data['system_load']['load_average']['1min'],
+}
+COLUMN_NAMES = tuple(COLUMN_EXTRACTORS)
+
+# Converted-document paths that are also columns, so projected history queries can skip the documents
+FIELD_COLUMNS = {
+    'cpu.usage_percent': 'cpu.usage_percent',
+    'memory.usage_percent': 'memory.usage_percent',
+    'memory.swap_usage_percent': 'memory.swap_usage_percent',
+    'gpu.gpu.utilization_percent': 'gpu.utilization_percent',
+    'system_load.load_average.1min': 'system_load.1min',
+}
+
+
+def column_row(data):
+    """The COLUMN_NAMES fields of a complete converted sample, in one walk of the document
+
+    Same values as COLUMN_EXTRACTORS (keep both in step), without a call
+    and an exception handler per field; raises when any field is missing.
+    """
+    memory = data['memory']
+    interfaces = data['network']['interfaces']
+    if len(interfaces) == 1:
+        rx = int(interfaces[0]['rx_bytes']) / (1024**2)
+        tx = int(interfaces[0]['tx_bytes']) / (1024**2)
+    else:
+        rx = sum(int(iface['rx_bytes']) for iface in interfaces) / (1024**2)
+        tx = sum(int(iface['tx_bytes']) for iface in interfaces) / (1024**2)
+    return (
+        float(data['cpu']['usage_percent']),
+        float(memory['usage_percent']),
+        float(memory['swap_usage_percent']),
+        max(float(fs['usage_percent']) for fs in data['disk']['filesystems']),
+        rx,
+        tx,
+        float(data['gpu']['gpu']['utilization_percent']),
+        float(data['system_load']['load_average']['1min']),
+    )
+
+
+def column_values(data):
+    """float64 array of the COLUMN_NAMES fields of a converted sample, NaN where missing"""
+    try:
+        return array('d', column_row(data))
+    except (KeyError, TypeError, ValueError, IndexError):
+        pass
+    nan = float('nan')
+    values = array('d')
+    for extract in COLUMN_EXTRACTORS.values():
+        try:
+            values.append(float(extract(data)))
+        except (KeyError, TypeError, ValueError, IndexError):
+            values.append(nan)
+    return values
@@ -0,0 +1,89 @@
+"""
+System Monitor Fleet Aggregates
+Per-host and fleet-wide percentiles of one metric, computed over a padded NumPy matrix
+"""
+
+import numpy as np
+
+# Window suffix -> seconds; a bare number is hours
+WINDOW_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+MAX_WINDOW = 366 * 86400
+
+
+def parse_window(value):
+    """Seconds of a window argument such as 15m, 1h or 7d; raises ValueError"""
+    value = value.strip().lower()
+    unit = WINDOW_UNITS.get(value[-1:])
+    try:
+        seconds = float(value[:-1]) * unit if unit else float(value) * 3600
+    except ValueError:
+        seconds = 0
+    if not 0 < seconds <= MAX_WINDOW:
+        raise ValueError(f'Invalid window: {value}')
+    return seconds
+
+
+def row_quantiles(ordered, counts, fraction):
+    """Linear-interpolated quantile of every row of a matrix sorted with NaN padding last"""
+    pos = (counts - 1) * fraction
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.ceil(pos).astype(np.intp)
+    rows = np.arange(len(ordered))
+    low = ordered[rows, lo]
+    return low + (ordered[rows, hi] - low) * (pos - lo)
+
+
+def fleet_summary(names, series, top=10, peaks=None):
+    """Per-host and fleet-wide p50/p95/max of one metric, plus the top hosts by p95
+
+    names[i] labels the float array series[i]. All hosts go into one
+    NaN-padded matrix that is sorted row-wise once, so the statistics of
+    every host come out of a handful of array operations. Hosts without a
+    finite value in the window are left out.
+
+    peaks[i], when not None, holds the bucket maxima of a host whose series
+    are rollup bucket averages: its max is taken from them, and its
+    percentiles (those of bucket averages) are marked approximate.
+    """
+    series = [np.asarray(values, dtype=np.float64) for values in series]
+    peaks = peaks or [None] * len(series)
+    width = max((len(values) for values in series), default=0)
+    matrix = np.full((len(series), width), np.nan)
+    for row, values in enumerate(series):
+        matrix[row, :len(values)] = values
+
+    # np.sort puts NaN last, so each row's finite values come first
+    ordered = np.sort(matrix, axis=1)
+    counts = np.count_nonzero(~np.isnan(matrix), axis=1)
+    live = counts > 0
+    ordered, counts = ordered[live], counts[live]
+    live_names = [name for name, keep in zip(names, live) if keep]
+    live_peaks = [values for values, keep in zip(peaks, live) if keep]
+
+    p50 = row_quantiles(ordered, counts, 0.5)
+    p95 = row_quantiles(ordered, counts, 0.95)
+    peak = ordered[np.arange(len(ordered)), counts - 1]
+    for row, values in enumerate(live_peaks):
+        if values is not None and np.any(~np.isnan(values)):
+            peak[row] = max(peak[row], np.nanmax(values))
+
+    hosts = {}
+    for name, count, a, b, c, values in zip(live_names, counts, p50, p95, peak, live_peaks):
+        hosts[name] = {'samples': int(count), 'p50': float(a), 'p95': float(b), 'max': float(c)}
+        if values is not None:
+            hosts[name]['approximate'] = True
+    hottest = np.argsort(-p95, kind='stable')[:top]
+
+    values = ordered[~np.isnan(ordered)]
+    fleet = {'hosts': len(live_names), 'samples': int(values.size)}
+    if values.size:
+        fleet_p50, fleet_p95 = np.percentile(values, [50, 95])
+        fleet.update(p50=float(fleet_p50), p95=float(fleet_p95), max=float(peak.max()))
+        if any(values is not None for values in live_peaks):
+            fleet['approximate'] = True
+
+    return {
+        'fleet': fleet,
+        'hosts': hosts,
+        'top': [dict(host=live_names[i], **hosts[live_names[i]]) for i in hottest]
+    }
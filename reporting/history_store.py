@@ -0,0 +1,498 @@
+"""
+System Monitor History Store
+Append-only hourly segment files shared by the collectors and the reporter
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from array import array
+from heapq import merge
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows collectors are the only writer of their history
+    fcntl = None
+
+from rollups import Rollups
+from schema import to_canonical
+from fields import column_values
+from ring_buffer import RING_DIR, RING_SUFFIX, append_record
+from archives import ARCHIVE_DIR, ARCHIVE_DAY_FORMAT, ARCHIVE_SUFFIX, is_archive, decode_offset, read_block, scan_archive
+
+logger = logging.getLogger(__name__)
+
+# Segments live under history/segments/<source>/YYYYMMDD_HH.ndjson, one
+# compact JSON document per line.
+SEGMENTS_DIR = 'segments'
+SEGMENT_FORMAT = '%Y%m%d_%H'
+SEGMENT_SUFFIX = '.ndjson'
+
+# Every append also adds "<epoch>\t<relative path>\t<offset>" to
+# history/index/<source>.tsv. Whole-file entries use offset -1.
+INDEX_DIR = 'index'
+INDEX_SUFFIX = '.tsv'
+
+# Taken by every manifest writer, so compaction can rewrite a manifest safely
+LOCK_SUFFIX = '.lock'
+
+# Source names become file and directory names: no separators, no leading dot
+SOURCE_NAME = re.compile(r'[A-Za-z0-9_-][A-Za-z0-9._-]*')
+
+# One-file-per-sample history written by older collectors
+LEGACY_SUFFIX = '.json'
+LEGACY_TIME_FORMAT = '%Y%m%d_%H%M%S'
+
+
+def parse_timestamp(value):
+    """Parse an ISO timestamp into a naive local datetime"""
+    when = datetime.fromisoformat(value)
+    if when.tzinfo is not None:
+        when = when.astimezone().replace(tzinfo=None)
+    return when
+
+
+class HistoryStore:
+    """Append-only metrics history, one segment file per source and hour"""
+
+    def __init__(self, history_dir):
+        self.history_dir = history_dir
+        self.segments_dir = os.path.join(history_dir, SEGMENTS_DIR)
+        self.rollups = Rollups(history_dir)
+        # Called with the paths of files that dropped out of the index and no longer exist
+        self.removal_listeners = []
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def segment_path(self, source, when):
+        """Path of the segment holding samples of a source for the hour of `when`"""
+        name = when.strftime(SEGMENT_FORMAT) + SEGMENT_SUFFIX
+        return os.path.join(self.segments_dir, source, name)
+
+    def manifest_path(self, source):
+        """Path of the persistent time index of a source"""
+        return os.path.join(self.history_dir, INDEX_DIR, source + INDEX_SUFFIX)
+
+    def ring_path(self, source):
+        """Path of the memory-mapped ring of a source's most recent samples"""
+        return os.path.join(self.history_dir, RING_DIR, source + RING_SUFFIX)
+
+    def archive_path(self, source, day, generation=0):
+        """Path of a compacted day of a source; rebuilds of a day get a new generation"""
+        name = f'{day.strftime(ARCHIVE_DAY_FORMAT)}.{generation}{ARCHIVE_SUFFIX}'
+        return os.path.join(self.history_dir, ARCHIVE_DIR, source, name)
+
+    @contextmanager
+    def manifest_lock(self, source):
+        """Hold the manifest of a source against other writers, across processes"""
+        manifest = self.manifest_path(source)
+        os.makedirs(os.path.dirname(manifest), exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(manifest[:-len(INDEX_SUFFIX)] + LOCK_SUFFIX, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def write_manifest(self, source, entries):
+        """Replace the manifest of a source with (epoch, path, offset) entries
+
+        Callers hold manifest_lock(). Readers notice the new file and reindex.
+        """
+        manifest = self.manifest_path(source)
+        tmp = manifest + '.tmp'
+        with open(tmp, 'wb') as f:
+            for epoch, path, offset in entries:
+                relpath = os.path.relpath(path, self.history_dir).replace(os.sep, '/')
+                f.write(f'{epoch:.6f}\t{relpath}\t{offset}\n'.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, manifest)
+
+    def append(self, source, metrics):
+        """Append one sample to the segment for its hour, the ring, the time index and the rollups"""
+        timestamp = metrics.get('timestamp') or metrics.get('system_info', {}).get('collection_time')
+        when = parse_timestamp(timestamp) if timestamp else datetime.now()
+        path = self.segment_path(source, when)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # A single write of a complete line keeps concurrent readers safe
+        line = json.dumps(metrics, separators=(',', ':')).encode('utf-8') + b'\n'
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            f.write(line)
+
+        relpath = os.path.relpath(path, self.history_dir).replace(os.sep, '/')
+        with self.manifest_lock(source):
+            # The ring is written first, so it normally holds every sample the index
+            # announces; readers compare counts and fall back to segments when not
+            try:
+                append_record(self.ring_path(source), when.timestamp(), column_values(to_canonical(metrics)))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning('Ring buffer append failed for %s: %s', source, e)
+            # Opened under the lock, so a manifest replaced by compaction is appended to
+            with open(self.manifest_path(source), 'ab') as f:
+                f.write(f'{when.timestamp():.6f}\t{relpath}\t{offset}\n'.encode('utf-8'))
+
+        self.rollups.add(source, when, metrics)
+        return path
+
+    @staticmethod
+    def valid_source(source):
+        """Whether a source name is safe to use in paths"""
+        return bool(SOURCE_NAME.fullmatch(source or ''))
+
+    def has_source(self, source):
+        """Whether a source has a valid name and history on disk (a time index or segments)"""
+        return self.valid_source(source) and (
+            os.path.exists(self.manifest_path(source))
+            or os.path.isdir(os.path.join(self.segments_dir, source)))
+
+    def index(self, source):
+        """In-memory time index of a source, shared by all lookups; raises ValueError for unsafe names"""
+        if not self.valid_source(source):
+            raise ValueError(f'Invalid source: {source!r}')
+        with self._lock:
+            if source not in self._indexes:
+                self._indexes[source] = HistoryIndex(self, source)
+            return self._indexes[source]
+
+    def lookup(self, source, start, end=None):
+        """Return (epoch, path, offset) entries of a source within [start, end]"""
+        return self.index(source).lookup(start, end)
+
+    def lookup_after(self, source, epoch):
+        """Return (epoch, path, offset) entries of a source newer than epoch"""
+        return self.index(source).lookup_after(epoch)
+
+    def contains(self, source, epoch):
+        """Whether a sample of a source with exactly this timestamp is indexed"""
+        return self.index(source).contains(epoch)
+
+    def version(self, source):
+        """Changes whenever a sample of a source is indexed"""
+        return self.index(source).version()
+
+    def count_since(self, source, epoch):
+        """Number of indexed samples of a source at or after epoch"""
+        return self.index(source).count_since(epoch)
+
+    def sources(self):
+        """Names of the sources with a time index"""
+        try:
+            names = os.listdir(os.path.join(self.history_dir, INDEX_DIR))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(INDEX_SUFFIX)] for name in names if name.endswith(INDEX_SUFFIX))
+
+    def read_entries(self, entries):
+        """Yield (entry, raw sample) for index entries, reusing open segments
+
+        Archived samples are read a block at a time, each block decompressed once.
+        """
+        current_path = None
+        f = None
+        block = None
+        try:
+            for entry in entries:
+                path = entry[1]
+                if path != current_path:
+                    if f:
+                        f.close()
+                    f = None
+                    block = None
+                    current_path = path
+                    try:
+                        f = open(path, 'rb')
+                    except OSError:
+                        continue
+                if f is None:
+                    continue
+
+                if is_archive(path):
+                    block_offset, line = decode_offset(entry[2])
+                    if block is None or block[0] != block_offset:
+                        try:
+                            block = (block_offset, read_block(f, block_offset))
+                        except (OSError, ValueError):
+                            block = (block_offset, [])
+                    if line >= len(block[1]):
+                        continue
+                    raw = block[1][line]
+                elif entry[2] < 0:
+                    f.seek(0)
+                    raw = f.read()
+                else:
+                    f.seek(entry[2])
+                    raw = f.readline()
+                    if not raw.endswith(b'\n'):
+                        continue
+                try:
+                    yield entry, json.loads(raw)
+                except ValueError:
+                    continue
+        finally:
+            if f:
+                f.close()
+
+    def read_range(self, source, start, end=None):
+        """Yield raw samples of a source collected within [start, end]"""
+        for _, data in self.read_entries(self.lookup(source, start, end)):
+            yield data
+
+    @staticmethod
+    def sample_epoch(data):
+        """Collection time of a sample; canonical documents only carry system_info.collection_time"""
+        return parse_timestamp(data.get('timestamp') or data['system_info']['collection_time']).timestamp()
+
+    def scan_segment(self, path, stop_offset=None):
+        """Yield (epoch, offset) for each complete line of a segment"""
+        offset = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n') or (stop_offset is not None and offset >= stop_offset):
+                    break
+                try:
+                    epoch = self.sample_epoch(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    epoch = None
+                if epoch is not None:
+                    yield epoch, offset
+                offset += len(line)
+
+
+class HistoryIndex:
+    """Sorted in-memory view of one source's time index, updated incrementally
+
+    The manifest is tailed from the last read position, so a refresh only
+    parses entries appended since the previous lookup. Segments that predate
+    the manifest and legacy per-sample files are indexed once in memory.
+    Entries are kept in typed arrays (epoch, path number, offset), about 20
+    bytes each, with every distinct path stored once.
+    """
+
+    def __init__(self, store, source):
+        self.store = store
+        self.source = source
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.times = array('d')
+        self.path_ids = array('I')
+        self.offsets = array('q')
+        self.path_names = []
+        self._path_ids = {}
+        self._manifest_inode = None
+        self._manifest_pos = 0
+        self._backfilled = False
+        self._legacy_mtime = None
+        self._legacy_names = set()
+
+    def _entries(self, lo, hi):
+        names = self.path_names
+        return list(zip(self.times[lo:hi], map(names.__getitem__, self.path_ids[lo:hi]), self.offsets[lo:hi]))
+
+    def lookup(self, start, end=None):
+        """Return (epoch, path, offset) entries within [start, end] by binary search"""
+        with self._lock:
+            self._refresh_manifest()
+            self._refresh_legacy()
+            lo = bisect_left(self.times, start.timestamp())
+            hi = bisect_right(self.times, end.timestamp()) if end else len(self.times)
+            return self._entries(lo, hi)
+
+    def lookup_after(self, epoch):
+        """Return (epoch, path, offset) entries strictly newer than epoch"""
+        with self._lock:
+            self._refresh_manifest()
+            self._refresh_legacy()
+            return self._entries(bisect_right(self.times, epoch), len(self.times))
+
+    def contains(self, epoch):
+        """Whether a sample with exactly this timestamp is indexed"""
+        with self._lock:
+            self._refresh_manifest()
+            self._refresh_legacy()
+            pos = bisect_left(self.times, epoch)
+            return pos < len(self.times) and self.times[pos] == epoch
+
+    def version(self):
+        """(sample count, newest timestamp) after picking up new entries"""
+        with self._lock:
+            self._refresh_manifest()
+            self._refresh_legacy()
+            return len(self.times), self.times[-1] if self.times else None
+
+    def count_since(self, epoch):
+        """Number of indexed samples at or after epoch"""
+        with self._lock:
+            self._refresh_manifest()
+            self._refresh_legacy()
+            return len(self.times) - bisect_left(self.times, epoch)
+
+    def _path_id(self, relpath):
+        path_id = self._path_ids.get(relpath)
+        if path_id is None:
+            path_id = self._path_ids[relpath] = len(self.path_names)
+            self.path_names.append(os.path.join(self.store.history_dir, *relpath.split('/')))
+        return path_id
+
+    def _add(self, epoch, relpath, offset):
+        path_id = self._path_id(relpath)
+
+        if not self.times or epoch >= self.times[-1]:
+            self.times.append(epoch)
+            self.path_ids.append(path_id)
+            self.offsets.append(offset)
+        else:
+            # Rare (late samples); a memmove of the arrays
+            pos = bisect_right(self.times, epoch)
+            self.times.insert(pos, epoch)
+            self.path_ids.insert(pos, path_id)
+            self.offsets.insert(pos, offset)
+
+    def _merge(self, entries):
+        """Add many (epoch, relpath, offset) entries with one sort and one merge pass"""
+        entries = sorted((epoch, self._path_id(relpath), offset) for epoch, relpath, offset in entries)
+        if not entries:
+            return
+        if self.times and entries[0][0] < self.times[-1]:
+            # Stable on ties: entries already indexed stay first, as with _add
+            entries = list(merge(zip(self.times, self.path_ids, self.offsets), entries, key=itemgetter(0)))
+            self.times, self.path_ids, self.offsets = array('d'), array('I'), array('q')
+        self.times.extend(epoch for epoch, _, _ in entries)
+        self.path_ids.extend(path_id for _, path_id, _ in entries)
+        self.offsets.extend(offset for _, _, offset in entries)
+
+    def _refresh_manifest(self):
+        manifest = self.store.manifest_path(self.source)
+        try:
+            st = os.stat(manifest)
+        except FileNotFoundError:
+            st = None
+
+        # Manifest created, replaced or truncated since the last refresh: start over
+        if st and st.st_ino != self._manifest_inode:
+            replaced = self._manifest_inode is not None or self._backfilled
+        else:
+            replaced = bool(st) and st.st_size < self._manifest_pos
+        previous = {self.path_names[i] for i in set(self.path_ids)} if replaced else None
+        if replaced:
+            self._reset()
+
+        first = None
+        if st and st.st_size > self._manifest_pos:
+            with open(manifest, 'rb') as f:
+                f.seek(self._manifest_pos)
+                chunk = f.read(st.st_size - self._manifest_pos)
+            end = chunk.rfind(b'\n') + 1
+            for line in chunk[:end].decode('utf-8').splitlines():
+                try:
+                    epoch, relpath, offset = line.split('\t')
+                    entry = (float(epoch), relpath, int(offset))
+                except ValueError:
+                    continue
+                if first is None:
+                    first = entry
+                self._add(*entry)
+            self._manifest_pos += end
+        if st:
+            self._manifest_inode = st.st_ino
+
+        if not self._backfilled:
+            self._backfill(first)
+            self._backfilled = True
+
+        # Files dropped by the rewrite (e.g. compacted segments) may have their inodes reused
+        if previous:
+            current = {self.path_names[i] for i in set(self.path_ids)}
+            removed = {path for path in previous.difference(current) if not os.path.exists(path)}
+            if removed:
+                for listener in self.store.removal_listeners:
+                    listener(removed)
+
+    def _backfill(self, first):
+        """Index segment lines written before the manifest existed
+
+        A manifest starting with an archive was rewritten by compaction and
+        covers everything before it. Without a manifest, archives are
+        indexed too.
+        """
+        if first and not first[1].startswith(SEGMENTS_DIR + '/'):
+            return
+        if first is None:
+            self._backfill_archives()
+
+        source_dir = os.path.join(self.store.segments_dir, self.source)
+        try:
+            names = sorted(os.listdir(source_dir))
+        except FileNotFoundError:
+            return
+
+        first_name = first[1].rsplit('/', 1)[-1] if first else None
+        for name in names:
+            if not name.endswith(SEGMENT_SUFFIX) or (first_name and name > first_name):
+                continue
+            stop = first[2] if first_name == name else None
+            relpath = f'{SEGMENTS_DIR}/{self.source}/{name}'
+            for epoch, offset in self.store.scan_segment(os.path.join(source_dir, name), stop):
+                self._add(epoch, relpath, offset)
+
+    def _backfill_archives(self):
+        archive_dir = os.path.join(self.store.history_dir, ARCHIVE_DIR, self.source)
+        try:
+            names = sorted(os.listdir(archive_dir))
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not is_archive(name):
+                continue
+            try:
+                for epoch, offset in scan_archive(os.path.join(archive_dir, name), self.store.sample_epoch):
+                    self._add(epoch, f'{ARCHIVE_DIR}/{self.source}/{name}', offset)
+            except (OSError, ValueError):
+                continue
+
+    def _refresh_legacy(self):
+        """Index legacy per-sample files when the history directory changes"""
+        try:
+            mtime = os.stat(self.store.history_dir).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._legacy_mtime:
+            return
+        self._legacy_mtime = mtime
+
+        # Only files named after the source, so other sources' files are never mixed in
+        prefix = self.source + '_metrics_'
+
+        # Collected and merged in one pass; scandir order is arbitrary, so adding
+        # them one by one would insert into the middle of the index each time
+        found = []
+        with os.scandir(self.store.history_dir) as it:
+            for entry in it:
+                name = entry.name
+                if name in self._legacy_names or not name.endswith(LEGACY_SUFFIX):
+                    continue
+                if not name.startswith(prefix) or '_metrics_' not in name:
+                    continue
+                # Extract timestamp: windows_metrics_20251216_011410.json
+                stamp = name[:-len(LEGACY_SUFFIX)].split('_metrics_', 1)[1]
+                try:
+                    epoch = datetime.strptime(stamp, LEGACY_TIME_FORMAT).timestamp()
+                except ValueError:
+                    continue
+                self._legacy_names.add(name)
+                found.append((epoch, name, -1))
+        self._merge(found)
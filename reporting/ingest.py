@@ -0,0 +1,184 @@
+"""
+System Monitor Push Ingestion
+Batches of samples posted by remote agents, written to per-host history shards
+"""
+
+import os
+import re
+import json
+import zlib
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows runs a single reporter process, where the writer thread is the only writer
+    fcntl = None
+
+from history_store import parse_timestamp
+from schema import to_canonical
+
+# Child of the reporter's app.logger (Flask names it after the module), sharing its handler
+logger = logging.getLogger('reporter.ingest')
+
+# Every pushing host gets its own history source, e.g. "host-web01"
+HOST_PREFIX = 'host-'
+HOST_NAME_MAX = 64
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9._-]')
+
+# Per-host lock files, under the history directory
+LOCKS_DIR = 'locks'
+
+
+class BatchTooLarge(ValueError):
+    """A batch over the size limit, raw or decompressed"""
+
+
+def host_source(hostname):
+    """History source name of a pushing host; raises ValueError"""
+    name = _UNSAFE_CHARS.sub('_', str(hostname or '').strip())[:HOST_NAME_MAX].lstrip('.')
+    if not name:
+        raise ValueError('Sample without a hostname')
+    return HOST_PREFIX + name
+
+
+def is_host_source(source):
+    return source.startswith(HOST_PREFIX)
+
+
+def sample_epoch(doc):
+    """Timestamp of a canonical sample as stored in the time index; raises ValueError"""
+    timestamp = doc.get('timestamp') or doc.get('system_info', {}).get('collection_time')
+    if not timestamp:
+        raise ValueError('Sample without a timestamp')
+    # Same precision as the manifest, so stored samples compare equal
+    return float(f'{parse_timestamp(timestamp).timestamp():.6f}')
+
+
+def decode_body(body, encoding, max_bytes):
+    """Request body with gzip content encoding undone, at most max_bytes
+
+    Raises BatchTooLarge past max_bytes and ValueError for invalid gzip.
+    """
+    if (encoding or '').lower() not in ('gzip', 'x-gzip') and not body.startswith(b'\x1f\x8b'):
+        return body
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(body, max_bytes + 1)
+    except zlib.error as e:
+        raise ValueError(f'Invalid gzip body: {e}')
+    if len(data) > max_bytes:
+        raise BatchTooLarge(f'Batch larger than {max_bytes} bytes')
+    return data
+
+
+def parse_batch(data):
+    """(source, epoch, canonical doc) for every NDJSON line of a batch; raises ValueError
+
+    A batch is rejected as a whole so agents keep it and can retry once fixed.
+    """
+    samples = []
+    for number, line in enumerate(data.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            doc = to_canonical(json.loads(line))
+            source = host_source(doc['system_info'].get('hostname'))
+            epoch = sample_epoch(doc)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f'Line {number}: {e!r}')
+        samples.append((source, epoch, doc))
+    return samples
+
+
+class Ingestor:
+    """Bounded queue of posted batches, drained by one writer thread
+
+    submit() drops samples that are already stored or still queued and
+    raises queue.Full once the queued batches would exceed max_bytes (their
+    decoded size), so the endpoint can answer 429 and agents back off
+    instead of the reporter buffering without bound. The writer checks for duplicates again under a per-host file
+    lock, which keeps shards consistent when several worker processes ingest.
+    """
+
+    def __init__(self, store, max_bytes=64 * 1024 * 1024):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.queue = queue.Queue()
+        self._queued_bytes = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, samples, size):
+        """Queue (source, epoch, doc) samples decoded from size bytes; returns (queued, duplicates)"""
+        fresh = []
+        keys = set()
+        for source, epoch, doc in samples:
+            key = (source, epoch)
+            if key in keys or self.store.contains(source, epoch):
+                continue
+            keys.add(key)
+            fresh.append((source, epoch, doc))
+
+        with self._lock:
+            fresh = [sample for sample in fresh if sample[:2] not in self._pending]
+            if fresh:
+                # A lone batch is always taken, so a limit below the batch size cannot wedge agents
+                if self._queued_bytes and self._queued_bytes + size > self.max_bytes:
+                    raise queue.Full
+                self._queued_bytes += size
+                self.queue.put_nowait((fresh, size))
+                self._pending.update(sample[:2] for sample in fresh)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+                    self._thread.start()
+        return len(fresh), len(samples) - len(fresh)
+
+    def hosts(self):
+        """History sources of the hosts that have pushed samples"""
+        return [source for source in self.store.sources() if is_host_source(source)]
+
+    def _run(self):
+        while True:
+            batch, size = self.queue.get()
+            try:
+                self._write(batch)
+            finally:
+                with self._lock:
+                    self._pending.difference_update(sample[:2] for sample in batch)
+                    self._queued_bytes -= size
+                self.queue.task_done()
+
+    def _write(self, batch):
+        by_source = {}
+        for source, epoch, doc in batch:
+            by_source.setdefault(source, []).append((epoch, doc))
+
+        for source, samples in by_source.items():
+            samples.sort(key=lambda sample: sample[0])
+            try:
+                with self._host_lock(source):
+                    for epoch, doc in samples:
+                        if not self.store.contains(source, epoch):
+                            self.store.append(source, doc)
+            except OSError as e:
+                logger.error('Error writing pushed samples of %s: %s', source, e)
+
+    @contextmanager
+    def _host_lock(self, source):
+        """Hold the lock of one host's shard across worker processes"""
+        if fcntl is None:
+            yield
+            return
+        path = os.path.join(self.store.history_dir, LOCKS_DIR, source + '.lock')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,171 @@
+"""
+System Monitor Latest-Snapshot Cache
+Keeps the converted latest_<source>.json snapshots in memory, refreshed by a
+directory watcher instead of being re-read on every request
+"""
+
+import os
+import sys
+import time
+import struct
+import select
+import threading
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class Inotify:
+    """Minimal inotify watch on one directory via libc, or None where unsupported"""
+
+    @classmethod
+    def open(cls, path, mask):
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            if libc.inotify_add_watch(fd, os.fsencode(path), mask) < 0:
+                os.close(fd)
+                return None
+        except (OSError, AttributeError):
+            return None
+        return cls(fd)
+
+    def __init__(self, fd):
+        self.fd = fd
+        # poll() rather than select(): a busy server has descriptors past 1024
+        self._poll = select.poll()
+        self._poll.register(fd, select.POLLIN)
+
+    def wait(self, timeout):
+        """True when events are pending within timeout seconds"""
+        return bool(self._poll.poll(timeout * 1000))
+
+    def read_names(self):
+        """File names of all pending events"""
+        names = set()
+        while True:
+            try:
+                buffer = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return names
+            pos = 0
+            while pos + EVENT_HEADER.size <= len(buffer):
+                _, _, _, length = EVENT_HEADER.unpack_from(buffer, pos)
+                pos += EVENT_HEADER.size
+                names.add(buffer[pos:pos + length].rstrip(b'\0').decode('utf-8', 'replace'))
+                pos += length
+
+
+class LatestSnapshots:
+    """Converted latest snapshot of every source, kept current by a watcher thread
+
+    The watcher reacts to inotify events on the data directory and also
+    stats the latest files every `interval` seconds, which covers systems
+    without inotify and mounts where events from the writer never arrive
+    (e.g. Docker Desktop bind mounts of a Windows folder). Requests only
+    read memory once a source has been loaded.
+
+    convert(raw bytes) returns (converted, as_is), as_is meaning the raw
+    document already is in reporter format and can be served unchanged.
+    """
+
+    def __init__(self, data_dir, convert, interval=2.0):
+        self.data_dir = data_dir
+        self.convert = convert
+        self.interval = interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.inotify = False
+
+    def path(self, source):
+        return os.path.join(self.data_dir, f'latest_{source}.json')
+
+    def get(self, source):
+        """Converted snapshot of a source, or None"""
+        return self._entry(source)[2]
+
+    def raw(self, source):
+        """Bytes of the snapshot when it is already in reporter format, else None"""
+        _, raw, converted, as_is = self._entry(source)
+        return raw if as_is and converted is not None else None
+
+    def version(self, source):
+        """(mtime_ns, size) of the cached snapshot, or None"""
+        return self._entry(source)[0]
+
+    def _entry(self, source):
+        self._start()
+        entry = self._entries.get(source)
+        if entry is None:
+            entry = self._load(source)
+        return entry
+
+    def _load(self, source):
+        """Read and convert a source's latest file if it changed since it was cached"""
+        path = self.path(source)
+        with self._lock:
+            entry = self._entries.get(source)
+            try:
+                st = os.stat(path)
+                stamp = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                stamp = None
+            if entry is not None and entry[0] == stamp:
+                return entry
+
+            if stamp is None:
+                entry = (None, None, None, False)
+            else:
+                try:
+                    with open(path, 'rb') as f:
+                        raw = f.read().strip()
+                    converted, as_is = self.convert(raw)
+                except (OSError, ValueError):
+                    # Caught mid-write: keep serving the previous snapshot, retry on the next event
+                    return entry or (stamp, None, None, False)
+                entry = (stamp, raw, converted, as_is)
+            self._entries[source] = entry
+            return entry
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._watch, name='latest-snapshots', daemon=True)
+                    self._thread.start()
+
+    def _watch(self):
+        watch = None
+        while True:
+            opened = False
+            if watch is None and os.path.isdir(self.data_dir):
+                watch = Inotify.open(self.data_dir, IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE)
+                self.inotify = opened = watch is not None
+
+            # A new watch first re-checks everything, catching changes made before it existed
+            changed = list(self._entries)
+            if watch is None:
+                time.sleep(self.interval)
+            elif not opened:
+                if watch.wait(self.interval):
+                    names = watch.read_names()
+                    changed = [source for source in self._entries if f'latest_{source}.json' in names]
+
+            for source in changed:
+                try:
+                    self._load(source)
+                except Exception:
+                    pass
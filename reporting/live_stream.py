@@ -0,0 +1,104 @@
+"""
+System Monitor Live Stream
+Fan-out of new-sample events to Server-Sent Events subscribers
+"""
+
+import json
+import queue
+import asyncio
+import threading
+import time
+
+
+def format_sse(event, data, event_id=None):
+    """Serialize one Server-Sent Events message"""
+    message = ''
+    if event_id is not None:
+        message += f'id: {event_id}\n'
+    message += f'event: {event}\n'
+    message += f'data: {json.dumps(data, separators=(",", ":"))}\n\n'
+    return message
+
+
+class Broadcaster:
+    """Polls for new data on one background thread and fans events out to subscribers
+
+    poll() is called every `interval` seconds while anyone is subscribed and
+    returns already serialized messages, so the work per new sample is done
+    once no matter how many clients are connected. Slow clients whose queue
+    is full miss events instead of holding everyone else up. reset(), if
+    given, runs whenever polling (re)starts.
+    """
+
+    def __init__(self, poll, interval=1.0, queue_size=100, reset=None):
+        self.poll = poll
+        self.reset = reset
+        self.interval = interval
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, subscription=None):
+        """Register a subscriber and return its message queue
+
+        Any object with put_nowait() can be passed in instead, e.g. an
+        AsyncSubscription for asyncio consumers.
+        """
+        if subscription is None:
+            subscription = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                # Start from the current data, not from where a previous run stopped
+                if self.reset:
+                    self.reset()
+                self._thread = threading.Thread(target=self._run, name='stream-broadcaster', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+                subscribers = list(self._subscribers)
+
+            try:
+                messages = self.poll()
+            except Exception:
+                continue
+
+            for message in messages:
+                for subscription in subscribers:
+                    try:
+                        subscription.put_nowait(message)
+                    except queue.Full:
+                        pass
+
+
+class AsyncSubscription:
+    """Subscriber queue read by an asyncio task and fed from the broadcaster thread"""
+
+    def __init__(self, loop, queue_size=100):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def put_nowait(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
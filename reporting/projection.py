@@ -0,0 +1,46 @@
+"""
+System Monitor Field Projection
+Subsets of history samples selected by dotted paths, e.g. fields=cpu.usage_percent,memory.usage_percent,
+built from history columns without decoding stored documents
+"""
+
+from fields import FIELD_COLUMNS
+
+# Always returned, so projected samples can still be placed in time
+TIMESTAMP_PATH = 'system_info.collection_time'
+
+# Only paths kept as history columns can be projected: any other field would
+# need every stored document decoded, which is what fields= is meant to avoid
+FIELDS = (TIMESTAMP_PATH,) + tuple(FIELD_COLUMNS)
+
+
+def parse_fields(value):
+    """Dotted paths of a fields= argument, the timestamp path first; raises ValueError"""
+    paths = [path.strip() for path in value.split(',') if path.strip()]
+    if not paths:
+        raise ValueError('No fields given')
+    for path in paths:
+        if path not in FIELDS:
+            raise ValueError(f"Unknown field: {path}, expected some of: {', '.join(FIELDS)}")
+    return tuple(dict.fromkeys([TIMESTAMP_PATH] + paths))
+
+
+def project_columns(columns, paths):
+    """Yield projected samples of HistoryColumns, for paths from parse_fields
+
+    No document is touched: values come straight from the column arrays,
+    and a NaN (the sample lacks the field) leaves the path out.
+    """
+    series = [(path.split('.'), columns[FIELD_COLUMNS[path]].tolist())
+              for path in paths if path != TIMESTAMP_PATH]
+    for i, timestamp in enumerate(columns.timestamps):
+        sample = {'system_info': {'collection_time': timestamp}}
+        for keys, values in series:
+            value = values[i]
+            if value != value:
+                continue
+            node = sample
+            for key in keys[:-1]:
+                node = node.setdefault(key, {})
+            node[keys[-1]] = value
+        yield sample
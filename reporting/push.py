@@ -0,0 +1,59 @@
+"""
+System Monitor Push Client
+Sends collected samples to a reporter's /api/ingest instead of a shared data volume
+"""
+
+import os
+import gzip
+
+# Reporter to push to, e.g. http://reporter:8080; pushing is off when unset
+PUSH_URL = os.getenv('METRICS_PUSH_URL')
+
+# Samples kept for the next run while the reporter is unreachable or busy
+SPOOL_MAX_SAMPLES = int(os.getenv('METRICS_PUSH_SPOOL', '10000'))
+
+
+def push_metrics(metrics_json, spool_path, url=PUSH_URL, timeout=10):
+    """Push a sample together with any still spooled from earlier runs
+
+    The sample is spooled first and the spool is only cleared once the
+    reporter accepted the batch; resending is safe because the reporter
+    drops samples it already has. Returns True when the batch was accepted.
+    """
+    if not url:
+        return False
+    # Imported here so collectors that do not push skip the HTTP/SSL import cost
+    import urllib.request
+    import urllib.error
+
+    os.makedirs(os.path.dirname(spool_path) or '.', exist_ok=True)
+    with open(spool_path, 'ab') as f:
+        f.write(metrics_json.encode('utf-8') + b'\n')
+    with open(spool_path, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    if len(lines) > SPOOL_MAX_SAMPLES:
+        lines = lines[-SPOOL_MAX_SAMPLES:]
+
+    request = urllib.request.Request(
+        url.rstrip('/') + '/api/ingest',
+        data=gzip.compress(b''.join(lines)),
+        headers={'Content-Type': 'application/x-ndjson', 'Content-Encoding': 'gzip'},
+        method='POST'
+    )
+    accepted = keep = False
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            accepted = response.status == 202
+    except urllib.error.HTTPError as e:
+        # 429 and server errors are retried next run; a rejected batch would be rejected forever
+        keep = e.code == 429 or e.code >= 500
+        print(f"Push to {url} failed with HTTP {e.code}" + (f", {len(lines)} samples spooled" if keep else ''))
+    except (urllib.error.URLError, OSError) as e:
+        keep = True
+        print(f"Push to {url} failed, {len(lines)} samples spooled: {e}")
+
+    # Rewritten rather than appended to, so the spool stays bounded
+    with open(spool_path, 'wb') as f:
+        if keep:
+            f.writelines(lines)
+    return accepted
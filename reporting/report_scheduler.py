@@ -0,0 +1,143 @@
+"""
+System Monitor Report Scheduler
+Pre-renders the reports of every source in the background and keeps the newest ones on disk
+"""
+
+import os
+import time
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows runs a single reporter process, which is always the one rendering
+    fcntl = None
+
+# Under the reporter's app.logger, so render failures land in the server log
+logger = logging.getLogger('reporter.report_scheduler')
+
+# data/reports/system_report_<source>_<YYYYmmdd_HHMMSS>.<ext>; names sort by render time
+REPORT_PREFIX = 'system_report_'
+REPORT_TIME_FORMAT = '%Y%m%d_%H%M%S'
+REPORT_TIME_LENGTH = 15
+REPORT_EXTENSIONS = {'html': '.html', 'markdown': '.md'}
+
+# Pre-rendered reports kept per source and format
+REPORT_KEEP = int(os.getenv('REPORT_KEEP', '48'))
+
+# Held by the one worker process that renders
+LOCK_NAME = '.scheduler.lock'
+
+
+def report_formats(value):
+    """Formats of a REPORT_FORMAT value: html, markdown or both"""
+    value = (value or '').strip().lower()
+    if value == 'both':
+        return tuple(REPORT_EXTENSIONS)
+    return (value,) if value in REPORT_EXTENSIONS else ()
+
+
+class ReportScheduler:
+    """Renders every source's reports each interval and writes them to reports_dir
+
+    render(source, fmt) returns the report text, or None when the source
+    has no data; sources() lists the sources to render. With several
+    worker processes only the one holding the directory's lock renders;
+    the others just serve what it wrote.
+    """
+
+    def __init__(self, reports_dir, formats, interval, render, sources, keep=REPORT_KEEP):
+        self.reports_dir = reports_dir
+        self.formats = formats
+        self.interval = interval
+        self.render = render
+        self.sources = sources
+        self.keep = keep
+        self._lock_file = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.formats and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name='report-scheduler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            if self._acquire():
+                self.run_once(due_only=True)
+            time.sleep(self.interval)
+
+    def _acquire(self):
+        """Whether this process renders, taking the lock if no other process holds it"""
+        if fcntl is None or self._lock_file is not None:
+            return True
+        os.makedirs(self.reports_dir, exist_ok=True)
+        f = open(os.path.join(self.reports_dir, LOCK_NAME), 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f
+        return True
+
+    def run_once(self, due_only=False):
+        """Render and write every source's reports; returns the paths written
+
+        With due_only, reports rendered less than an interval ago (e.g.
+        before a restart) are left alone.
+        """
+        written = []
+        for source in self.sources():
+            for fmt in self.formats:
+                if due_only and not self._due(source, fmt):
+                    continue
+                try:
+                    text = self.render(source, fmt)
+                    if text is not None:
+                        written.append(self.write(source, fmt, text))
+                except Exception as e:
+                    logger.error('Error pre-rendering %s report of %s: %s', fmt, source, e)
+        return written
+
+    def _due(self, source, fmt):
+        path = self.newest(source, fmt)
+        try:
+            return path is None or time.time() - os.path.getmtime(path) >= self.interval
+        except OSError:
+            return True
+
+    def _names(self, source, fmt):
+        """Names of a source's pre-rendered reports of one format, oldest first"""
+        prefix = f'{REPORT_PREFIX}{source}_'
+        suffix = REPORT_EXTENSIONS[fmt]
+        try:
+            names = os.listdir(self.reports_dir)
+        except FileNotFoundError:
+            return []
+        # The timestamp keeps "host-a" from matching the reports of "host-a_b"
+        return sorted(name for name in names if name.startswith(prefix) and name.endswith(suffix)
+                      and len(name) == len(prefix) + REPORT_TIME_LENGTH + len(suffix))
+
+    def newest(self, source, fmt):
+        """Path of the newest pre-rendered report, or None"""
+        names = self._names(source, fmt)
+        return os.path.join(self.reports_dir, names[-1]) if names else None
+
+    def write(self, source, fmt, text):
+        """Write a rendered report under a new name and drop those beyond keep; returns its path"""
+        os.makedirs(self.reports_dir, exist_ok=True)
+        stamp = time.strftime(REPORT_TIME_FORMAT)
+        path = os.path.join(self.reports_dir, f'{REPORT_PREFIX}{source}_{stamp}{REPORT_EXTENSIONS[fmt]}')
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+        for name in self._names(source, fmt)[:-self.keep or None]:
+            try:
+                os.remove(os.path.join(self.reports_dir, name))
+            except FileNotFoundError:
+                pass
+        return path
@@ -0,0 +1,119 @@
+"""
+System Monitor Report Statistics
+Window statistics of the report metrics, computed in one vectorized pass over history columns
+"""
+
+import numpy as np
+
+from fleet import row_quantiles
+from shell_config import read_shell_config
+
+# (history column, label, unit, warning threshold in config/alert_thresholds.conf)
+REPORT_METRICS = (
+    ('cpu.usage_percent', 'CPU Usage', '%', 'CPU_USAGE_WARNING'),
+    ('memory.usage_percent', 'Memory Usage', '%', 'MEMORY_USAGE_WARNING'),
+    ('memory.swap_usage_percent', 'Swap Usage', '%', 'SWAP_USAGE_WARNING'),
+    ('disk.max_usage_percent', 'Disk Usage (fullest)', '%', 'DISK_USAGE_WARNING'),
+    ('gpu.utilization_percent', 'GPU Utilization', '%', 'GPU_USAGE_WARNING'),
+    ('system_load.1min', 'System Load (1 min)', '', 'LOAD_WARNING'),
+)
+
+# Used when the thresholds file is missing or lacks a value; LOAD_WARNING is per CPU core
+DEFAULT_THRESHOLDS = {
+    'CPU_USAGE_WARNING': 70.0,
+    'MEMORY_USAGE_WARNING': 80.0,
+    'SWAP_USAGE_WARNING': 50.0,
+    'DISK_USAGE_WARNING': 80.0,
+    'GPU_USAGE_WARNING': 85.0,
+    'LOAD_WARNING': 1.5,
+}
+
+PERCENTILES = (50, 95, 99)
+
+# A sample stands for the time until the next one, at most this many typical intervals
+MAX_GAP_INTERVALS = 3
+
+
+def load_thresholds(path):
+    """Warning thresholds of REPORT_METRICS from a shell-style KEY=VALUE file"""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for key, value in read_shell_config(path).items():
+        if key in thresholds:
+            try:
+                thresholds[key] = float(value)
+            except ValueError:
+                pass
+    return thresholds
+
+
+def sample_durations(epochs):
+    """Seconds each sample stands for: the step to the next one, gaps capped"""
+    steps = np.diff(epochs)
+    typical = float(np.median(steps)) if len(steps) else 0.0
+    return np.append(np.minimum(steps, typical * MAX_GAP_INTERVALS), typical)
+
+
+def window_stats(columns, thresholds, cores=None):
+    """Min/mean/percentiles/max and time above threshold of every REPORT_METRICS column
+
+    The metrics are stacked into one matrix that is sorted row-wise once,
+    so every statistic of every metric comes out of a few array operations.
+    The load threshold is scaled by cores when known. Metrics without a
+    value in the window get samples=0 and no statistics; an empty window
+    gives an empty list.
+    """
+    if not len(columns):
+        return []
+    matrix = np.vstack([columns[column] for column, _, _, _ in REPORT_METRICS])
+    durations = sample_durations(columns.epochs)
+    scale = {'LOAD_WARNING': cores or 1}
+    limits = np.array([thresholds[key] * scale.get(key, 1) for _, _, _, key in REPORT_METRICS])
+
+    finite = ~np.isnan(matrix)
+    counts = np.count_nonzero(finite, axis=1)
+    safe = np.maximum(counts, 1)
+    ordered = np.sort(matrix, axis=1)
+    means = np.where(finite, matrix, 0.0).sum(axis=1) / safe
+    quantiles = [row_quantiles(ordered, safe, p / 100) for p in PERCENTILES]
+
+    with np.errstate(invalid='ignore'):
+        above = np.where(matrix > limits[:, None], durations, 0.0).sum(axis=1)
+    covered = np.where(finite, durations, 0.0).sum(axis=1)
+
+    stats = []
+    for i, (column, label, unit, _) in enumerate(REPORT_METRICS):
+        row = {'column': column, 'label': label, 'unit': unit, 'samples': int(counts[i]),
+               'threshold': float(limits[i])}
+        if counts[i]:
+            row.update(min=float(ordered[i, 0]), mean=float(means[i]), max=float(ordered[i, counts[i] - 1]),
+                       above_seconds=float(above[i]),
+                       above_percent=float(100 * above[i] / covered[i]) if covered[i] else 0.0)
+            row.update({f'p{p}': float(q[i]) for p, q in zip(PERCENTILES, quantiles)})
+        stats.append(row)
+    return stats
+
+
+def bucket_series(columns, width):
+    """(bucket start epochs, {column: (min, mean, max) arrays}) of the REPORT_METRICS columns
+
+    Buckets are width seconds long and aligned on the epoch; only buckets
+    holding samples are returned. The epochs must be ascending, so every
+    bucket is one contiguous run that reduceat folds in a single pass.
+    """
+    if not len(columns):
+        return np.empty(0), {}
+    keys = np.floor(columns.epochs / width)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    matrix = np.vstack([columns[column] for column, _, _, _ in REPORT_METRICS])
+
+    finite = ~np.isnan(matrix)
+    counts = np.add.reduceat(finite, starts, axis=1)
+    sums = np.add.reduceat(np.where(finite, matrix, 0.0), starts, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    # fmin/fmax skip NaN, leaving it only for buckets without any value
+    lows = np.fmin.reduceat(matrix, starts, axis=1)
+    highs = np.fmax.reduceat(matrix, starts, axis=1)
+
+    series = {column: (lows[i], means[i], highs[i]) for i, (column, _, _, _) in enumerate(REPORT_METRICS)}
+    return keys[starts] * width, series
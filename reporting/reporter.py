@@ -4,14 +4,41 @@ Generates reports and serves web dashboard
 """
 
 import os
+import sys
 import json
-import glob
+import base64
+import hashlib
+import zlib
+import queue
+import time
+import threading
+from bisect import bisect_left
+from functools import partial
 from datetime import datetime, timedelta
 from pathlib import Path
-from flask import Flask, render_template, jsonify, send_file, request
-import plotly.graph_objs as go
-import plotly.utils
-import pandas as pd
+from flask import Flask, render_template, jsonify, send_file, request, stream_with_context
+import numpy as np
+
+# Sibling modules are imported by name so the collectors can share them
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from history_store import HistoryStore, parse_timestamp
+from sample_cache import LRUCache, SampleCache
+from rollups import TIERS, TIER_WIDTHS, COMPRESSED_SUFFIX, flatten_numeric, materialize, merge_buckets
+from archives import is_archive
+from downsample import downsample, lttb_indices
+from columns import (COLUMN_NAMES, build_columns, compact_sample, columns_from_samples,
+                     columns_from_arrays, concat_columns, interleave_columns)
+from ring_buffer import RingReader
+from live_stream import Broadcaster, format_sse
+from latest_cache import LatestSnapshots
+from schema import to_canonical
+from ingest import BatchTooLarge, Ingestor, decode_body, parse_batch, is_host_source
+from fleet import fleet_summary, parse_window
+from report_stats import bucket_series, load_thresholds, window_stats
+from report_scheduler import ReportScheduler, report_formats
+from shell_config import read_shell_config
+from projection import parse_fields, project_columns
 
 app = Flask(__name__)
 
@@ -19,10 +46,79 @@ app = Flask(__name__)
 PROJECT_ROOT = os.getenv('PROJECT_ROOT', os.path.dirname(os.path.dirname(__file__)))
 DATA_DIR = os.path.join(PROJECT_ROOT, 'data', 'metrics')
 REPORTS_DIR = os.path.join(PROJECT_ROOT, 'data', 'reports')
+CONFIG_DIR = os.path.join(PROJECT_ROOT, 'config')
+HISTORY_DIR = os.path.join(DATA_DIR, 'history')
+HISTORY_SOURCES = ('windows', 'wsl')
+
+# Parsed-sample cache: ~2 days of 3 s samples by default
+HISTORY_CACHE_MAX_SAMPLES = int(os.getenv('HISTORY_CACHE_MAX_SAMPLES', '60000'))
+HISTORY_CACHE_WARM_HOURS = int(os.getenv('HISTORY_CACHE_WARM_HOURS', '24'))
+
+# Compact chart samples (a few hundred bytes each): a week of 3 s samples by default
+HISTORY_COMPACT_MAX_SAMPLES = int(os.getenv('HISTORY_COMPACT_MAX_SAMPLES', '210000'))
+
+# SQLite file sharing compact samples between worker processes (set by gunicorn.conf.py)
+HISTORY_SHARED_CACHE = os.getenv('HISTORY_SHARED_CACHE')
+
+# Rendered API responses kept per (endpoint, arguments)
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '64'))
+
+# Latest snapshots are re-checked at least this often where inotify events may not arrive
+LATEST_POLL_INTERVAL = float(os.getenv('LATEST_POLL_INTERVAL', '2'))
+
+# Live stream: how often new samples are checked for, and the keep-alive period
+STREAM_POLL_INTERVAL = float(os.getenv('STREAM_POLL_INTERVAL', '1'))
+STREAM_KEEPALIVE = 15
+
+# Decoded bytes of pushed batches waiting to be written before /api/ingest answers 429, and the size limit of one batch
+INGEST_QUEUE_BYTES = int(os.getenv('INGEST_QUEUE_BYTES', str(64 * 1024 * 1024)))
+INGEST_MAX_BATCH_BYTES = int(os.getenv('INGEST_MAX_BATCH_BYTES', str(16 * 1024 * 1024)))
+INGEST_RETRY_AFTER = 2
+
+# Per-host point budget of /api/fleet; longer windows are summarized from rollup tiers
+FLEET_MAX_POINTS = int(os.getenv('FLEET_MAX_POINTS', '1500'))
+
+# Seconds a cached /api/fleet response is served while hosts keep pushing samples
+FLEET_REFRESH_SECONDS = int(os.getenv('FLEET_REFRESH_SECONDS', '15'))
+
+# Background report pre-rendering, configured in config/monitor.conf (environment variables override)
+monitor_config = read_shell_config(os.path.join(CONFIG_DIR, 'monitor.conf'))
+ENABLE_REPORTING = os.getenv('ENABLE_REPORTING', monitor_config.get('ENABLE_REPORTING', 'true')).lower() == 'true'
+REPORT_INTERVAL = int(os.getenv('REPORT_INTERVAL', monitor_config.get('REPORT_INTERVAL', '3600')))
+REPORT_FORMAT = os.getenv('REPORT_FORMAT', monitor_config.get('REPORT_FORMAT', 'html'))
+
+# Default report window, and the raw samples report statistics are computed over before rollups are used
+REPORT_HOURS = 24
+REPORT_MAX_SAMPLES = int(os.getenv('REPORT_MAX_SAMPLES', '100000'))
+
+# Trend charts of the HTML report: at most this many buckets per series (a rollup tier width each)
+REPORT_MAX_BUCKETS = int(os.getenv('REPORT_MAX_BUCKETS', '300'))
+REPORT_CHART_SIZE = (600, 120)
+
+# Samples read per chunk when iterating history
+HISTORY_CHUNK_SIZE = 500
+
+# Default chart window, and its point budget, picked by LTTB from raw samples; windows of
+# more than CHART_RAW_MAX_SAMPLES samples are traced by the min/max envelope of a rollup tier
+CHART_HOURS = 24
+CHART_MAX_POINTS = int(os.getenv('CHART_MAX_POINTS', '1500'))
+CHART_RAW_MAX_SAMPLES = int(os.getenv('CHART_RAW_MAX_SAMPLES', '100000'))
 
 # Ensure directories exist
 Path(REPORTS_DIR).mkdir(parents=True, exist_ok=True)
 
+history_store = HistoryStore(HISTORY_DIR)
+sample_cache = SampleCache(HISTORY_CACHE_MAX_SAMPLES)
+compact_cache = SampleCache(HISTORY_COMPACT_MAX_SAMPLES)
+shared_cache = None
+if HISTORY_SHARED_CACHE:
+    from shared_cache import SharedSampleCache
+    shared_cache = SharedSampleCache(HISTORY_SHARED_CACHE, HISTORY_COMPACT_MAX_SAMPLES)
+response_cache = LRUCache(RESPONSE_CACHE_SIZE)
+ring_readers = {}
+ingestor = Ingestor(history_store, INGEST_QUEUE_BYTES)
+report_thresholds = load_thresholds(os.path.join(CONFIG_DIR, 'alert_thresholds.conf'))
+
 # =================================================================
 # Data Loading Functions
 # =================================================================
@@ -33,238 +129,459 @@ def load_latest_metrics():
 
 def load_windows_metrics():
     """Load Windows metrics"""
-    latest_file = os.path.join(DATA_DIR, 'latest_windows.json')
-    return _load_and_convert_metrics(latest_file)
+    return latest_snapshots.get('windows')
 
 def load_wsl_metrics():
     """Load WSL/Docker metrics"""
-    latest_file = os.path.join(DATA_DIR, 'latest_wsl.json')
-    return _load_and_convert_metrics(latest_file)
+    return latest_snapshots.get('wsl')
 
-def _load_and_convert_metrics(latest_file):
-    """Helper to load and convert metrics from file"""
-    if os.path.exists(latest_file):
-        try:
-            with open(latest_file, 'r') as f:
-                content = f.read().strip()
-                if not content:
-                    return None
-                data = json.loads(content)
-        except (json.JSONDecodeError, ValueError):
-            return None
-        
-        # Check if it's Windows Python format (from monitor_windows.py)
-        if 'system' in data and 'cpu' in data:
-            # Convert Windows format to expected format
-            converted = {
-                    'system_info': {
-                        'hostname': data['system']['hostname'],
-                        'platform': data['system']['platform'],
-                        'version': data['system'].get('version', 'Unknown'),
-                        'architecture': data['system'].get('architecture', 'Unknown'),
-                        'collection_time': data.get('timestamp', ''),
-                        'uptime_seconds': 0
-                    },
-                    'cpu': {
-                        'usage_percent': data['cpu']['usage_percent'],
-                        'temperature_celsius': data['cpu'].get('temperature', 'N/A'),
-                        'core_count': data['cpu']['count'],
-                        'model': 'Unknown',
-                        'frequency_ghz': data['cpu']['frequency_mhz'] / 1000
-                    },
-                    'memory': {
-                        'total_bytes': int(data['memory']['total_gb'] * 1024**3),
-                        'used_bytes': int(data['memory']['used_gb'] * 1024**3),
-                        'available_bytes': int(data['memory']['available_gb'] * 1024**3),
-                        'usage_percent': data['memory']['percent'],
-                        'swap_total_bytes': int(data['swap']['total_gb'] * 1024**3),
-                        'swap_used_bytes': int(data['swap']['used_gb'] * 1024**3),
-                        'swap_usage_percent': data['swap']['percent']
-                    },
-                    'disk': {
-                        'filesystems': [
-                            {
-                                'device': d['device'],
-                                'mount': d['mountpoint'],
-                                'total': int(d['total_gb'] * 1024**3),
-                                'used': int(d['used_gb'] * 1024**3),
-                                'available': int(d['free_gb'] * 1024**3),
-                                'usage_percent': d['percent']
-                            } for d in data.get('disk', [])
-                        ],
-                        'io_stats': {
-                            'reads_completed': 0,
-                            'writes_completed': 0,
-                            'bytes_read': 0,
-                            'bytes_written': 0
-                        },
-                        'smart_status': 'N/A'
-                    },
-                    'network': {
-                        'interfaces': [
-                            {
-                                'interface': 'All',
-                                'rx_bytes': int(data['network']['bytes_recv_mb'] * 1024**2),
-                                'rx_packets': data['network']['packets_recv'],
-                                'rx_errors': 0,
-                                'tx_bytes': int(data['network']['bytes_sent_mb'] * 1024**2),
-                                'tx_packets': data['network']['packets_sent'],
-                                'tx_errors': 0
-                            }
-                        ],
-                        'active_connections': 0,
-                        'active_interface_names': ['All']
-                    },
-                    'gpu': {
-                        'gpu': {
-                            'vendor': 'NVIDIA' if data.get('gpu', {}).get('available') else 'None',
-                            'name': data.get('gpu', {}).get('name', 'No GPU detected'),
-                            'count': 1 if data.get('gpu', {}).get('available') else 0,
-                            'utilization_percent': data.get('gpu', {}).get('utilization', 0),
-                            'memory_used_bytes': int(data.get('gpu', {}).get('memory_used_mb', 0) * 1024**2),
-                            'memory_total_bytes': int(data.get('gpu', {}).get('memory_total_mb', 1) * 1024**2),
-                            'memory_percent': (data.get('gpu', {}).get('memory_used_mb', 0) / data.get('gpu', {}).get('memory_total_mb', 1) * 100) if data.get('gpu', {}).get('memory_total_mb', 0) > 0 else 0,
-                            'temperature_celsius': data.get('gpu', {}).get('temperature', 0),
-                            'power_watts': 0
-                        },
-                        'timestamp': data.get('timestamp', '')
-                    },
-                    'system_load': {
-                        'load_average': {
-                            '1min': data.get('system_load', {}).get('load_average', {}).get('1min', 0),
-                            '5min': data.get('system_load', {}).get('load_average', {}).get('5min', 0),
-                            '15min': data.get('system_load', {}).get('load_average', {}).get('15min', 0)
-                        },
-                        'total_processes': data.get('system_load', {}).get('total_processes', 0),
-                        'running_processes': data.get('system_load', {}).get('running_processes', 0),
-                        'sleeping_processes': data.get('system_load', {}).get('sleeping_processes', 0),
-                        'zombie_processes': data.get('system_load', {}).get('zombie_processes', 0),
-                        'top_cpu_processes': data.get('system_load', {}).get('top_cpu_processes', []),
-                        'timestamp': data.get('timestamp', '')
-                    }
-                }
-            return converted
-        
-        # Return as-is if already in correct format
-        return data
-    return None
+def load_source_metrics(source):
+    """Load the latest metrics of a source"""
+    if is_host_source(source):
+        return load_pushed_metrics(source)
+    return load_windows_metrics() if source == 'windows' else load_wsl_metrics()
+
+def load_pushed_metrics(source):
+    """Newest sample a remote host pushed to /api/ingest"""
+    _, newest = history_store.version(source)
+    if newest is None:
+        return None
+    samples = _load_history_entries(history_store.lookup_after(source, newest - 1e-3)[-1:])
+    return samples[-1] if samples else None
+
+def data_version(source, history=True):
+    """Version of a source's data, changing whenever a new sample is written
+    
+    Combines the latest file's mtime and size with the history high-water
+    mark, so cached responses are reused until new data arrives.
+    """
+    latest = latest_snapshots.version(source)
+    if not history:
+        return latest
+    return latest, history_store.version(source)
+
+def _parse_latest(raw):
+    """Parse and convert a latest-file body, flagging documents that needed no conversion"""
+    data = json.loads(raw)
+    converted = _convert_metrics(data)
+    return converted, converted is data
+
+def _convert_metrics(data):
+    """Convert a raw collector document to the reporter format"""
+    return to_canonical(data)
+
+# Converted latest snapshots, refreshed on file change rather than read per request
+latest_snapshots = LatestSnapshots(DATA_DIR, _parse_latest, LATEST_POLL_INTERVAL)
+
+def load_historical_metrics(hours=24, source='windows', max_points=None):
+    """Load metrics from the last N hours for specified source
+    
+    When the raw samples exceed max_points, the finest rollup tier that fits
+    the budget is returned instead (one averaged sample per bucket).
+    """
+    return list(iter_historical_metrics(hours, source, max_points))
 
-def load_historical_metrics(hours=24, source='windows'):
-    """Load metrics from the last N hours for specified source"""
+def iter_historical_metrics(hours=24, source='windows', max_points=None):
+    """Yield metrics from the last N hours, reading history in bounded chunks"""
     cutoff_time = datetime.now() - timedelta(hours=hours)
     
     # Look in history directory
-    history_dir = os.path.join(DATA_DIR, 'history')
-    if not os.path.exists(history_dir):
-        return []
-    
-    # Pattern based on source
-    if source == 'windows':
-        pattern = 'windows_metrics_*.json'
-    elif source == 'wsl':
-        pattern = 'wsl_metrics_*.json'
-    else:
-        pattern = '*_metrics_*.json'
+    if not os.path.exists(HISTORY_DIR):
+        return
     
-    metrics_files = glob.glob(os.path.join(history_dir, pattern))
+    # Binary search of the persistent time index, then read only matching samples
+    entries = history_store.lookup(source, cutoff_time)
     
-    historical_data = []
-    for file_path in sorted(metrics_files):
-        # Extract timestamp from filename
-        filename = os.path.basename(file_path)
-        try:
-            # Extract timestamp: windows_metrics_20251216_011410.json
-            parts = filename.split('_')
-            if len(parts) >= 4:
-                timestamp_str = parts[2] + '_' + parts[3].replace('.json', '')
-                file_time = datetime.strptime(timestamp_str, '%Y%m%d_%H%M%S')
-                
-                if file_time >= cutoff_time:
-                    data = _load_and_convert_metrics(file_path)
-                    if data:
-                        historical_data.append(data)
-        except Exception as e:
-            continue
+    if max_points and len(entries) > max_points:
+        rolled_up = _load_rollups(source, select_rollup_tier(hours, max_points), cutoff_time)
+        if rolled_up:
+            yield from rolled_up
+            return
     
-    return historical_data
+    yield from iter_history_entries(entries)
 
-# =================================================================
-# Chart Generation Functions
-# =================================================================
+def iter_history_entries(entries):
+    """Yield converted samples of index entries, HISTORY_CHUNK_SIZE at a time"""
+    for start in range(0, len(entries), HISTORY_CHUNK_SIZE):
+        yield from _load_history_entries(entries[start:start + HISTORY_CHUNK_SIZE])
 
-def generate_cpu_chart(historical_data):
-    """Generate CPU usage chart"""
-    timestamps = []
-    cpu_usage = []
+def load_history_columns(hours=24, source='windows', max_points=None):
+    """Load history as column arrays, unless rollups are used
     
-    for data in historical_data:
-        timestamps.append(data['system_info']['collection_time'])
-        cpu_usage.append(float(data['cpu']['usage_percent']))
+    Samples still in the source's ring buffer are sliced from it; only older
+    ones go through the compact sample cache.
+    """
+    cutoff_time = datetime.now() - timedelta(hours=hours)
+    entries = history_store.lookup(source, cutoff_time)
     
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=timestamps,
-        y=cpu_usage,
-        mode='lines+markers',
-        name='CPU Usage',
-        line=dict(color='#3498db', width=2)
-    ))
+    if max_points and len(entries) > max_points:
+        rolled_up = _load_rollups(source, select_rollup_tier(hours, max_points), cutoff_time)
+        if rolled_up:
+            return build_columns(rolled_up)
+    return _load_window_columns(source, entries, cutoff_time)
+
+def load_chart_window(source, hours, max_points):
+    """Column arrays of a chart window, from which LTTB keeps max_points
     
-    fig.update_layout(
-        title='CPU Usage Over Time',
-        xaxis_title='Time',
-        yaxis_title='Usage (%)',
-        yaxis=dict(range=[0, 100]),
-        template='plotly_white'
-    )
+    Windows of up to CHART_RAW_MAX_SAMPLES samples are loaded raw, so the
+    points kept are real samples and spikes survive. Longer windows are
+    traced by the min/max envelope of the finest rollup tier whose buckets
+    fit max_points (two points each), rather than by bucket averages.
+    """
+    cutoff_time = datetime.now() - timedelta(hours=hours)
+    entries = history_store.lookup(source, cutoff_time)
     
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    if max_points and len(entries) > max(max_points, CHART_RAW_MAX_SAMPLES):
+        tier = select_rollup_tier(hours, max(max_points // 2, 1))
+        lows = _load_rollups(source, tier, cutoff_time, 'min')
+        if lows:
+            highs = _load_rollups(source, tier, cutoff_time, 'max')
+            # A bucket closing between the two reads only adds one at the end
+            count = min(len(lows), len(highs))
+            return interleave_columns(build_columns(lows[:count]), build_columns(highs[:count]),
+                                      TIER_WIDTHS[tier] / 2)
+    return _load_window_columns(source, entries, cutoff_time)
 
-def generate_memory_chart(historical_data):
-    """Generate memory usage chart"""
-    timestamps = []
-    mem_usage = []
-    swap_usage = []
+def _load_window_columns(source, entries, cutoff_time):
+    """Column arrays of a window's index entries, the newest ones sliced from the ring buffer"""
+    recent = load_ring_columns(source, cutoff_time.timestamp())
+    if recent is None:
+        return load_entry_columns(entries)
+    columns, oldest = recent
+    # Manifest epochs are rounded to microseconds, samples are seconds apart
+    older = entries[:bisect_left(entries, (oldest - 1e-3,))]
+    return concat_columns(load_entry_columns(older), columns) if older else columns
+
+def load_ring_columns(source, start):
+    """(HistoryColumns from epoch start, oldest epoch held) of a source's ring buffer
     
-    for data in historical_data:
-        timestamps.append(data['system_info']['collection_time'])
-        mem_usage.append(float(data['memory']['usage_percent']))
-        swap_usage.append(float(data['memory']['swap_usage_percent']))
+    None when there is no ring or it misses samples of the time index, e.g.
+    for sources written by collectors that do not keep one, legacy files or
+    samples whose ring append failed.
+    """
+    reader = ring_readers.get(source)
+    if reader is None:
+        reader = ring_readers.setdefault(source, RingReader(history_store.ring_path(source)))
+    recent = reader.recent(start)
+    if recent is None:
+        return None
+    epochs, columns, oldest = recent
+    newest = history_store.version(source)[1]
+    if newest is None or not len(epochs) or abs(epochs[-1] - newest) > 1e-3:
+        return None
+    # Same newest sample, but every indexed sample of the ring's span must be there too
+    if history_store.count_since(source, epochs[0] - 1e-3) != len(epochs):
+        return None
+    return columns_from_arrays(epochs, columns), oldest
+
+def load_entry_columns(entries):
+    """Column arrays of index entries, built from the compact sample cache"""
+    return columns_from_samples(_load_cached_entries(entries, compact_cache, compact_sample, shared_cache))
+
+def parse_since(value):
+    """Epoch seconds of a since= argument: a cursor returned earlier or an ISO timestamp
     
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=timestamps,
-        y=mem_usage,
-        mode='lines+markers',
-        name='Memory Usage',
-        line=dict(color='#e74c3c', width=2)
-    ))
-    fig.add_trace(go.Scatter(
-        x=timestamps,
-        y=swap_usage,
-        mode='lines+markers',
-        name='Swap Usage',
-        line=dict(color='#f39c12', width=2)
-    ))
+    Raises ValueError when the value is neither.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return parse_timestamp(value).timestamp()
+
+def history_cursor(source):
+    """Cursor for the newest indexed sample of a source
     
-    fig.update_layout(
-        title='Memory Usage Over Time',
-        xaxis_title='Time',
-        yaxis_title='Usage (%)',
-        yaxis=dict(range=[0, 100]),
-        template='plotly_white'
-    )
+    Taken before a full window is loaded, so a sample written meanwhile may
+    be returned twice by the next delta but is never skipped.
+    """
+    return history_store.version(source)[1] or 0.0
+
+def history_delta(source, since, hours=None):
+    """Index entries newer than a cursor, and the cursor to pass next time
     
+    With hours set, entries older than the window are skipped even when the
+    cursor is further behind.
+    """
+    if hours is not None:
+        since = max(since, (datetime.now() - timedelta(hours=hours)).timestamp())
+    entries = history_store.lookup_after(source, since)
+    return entries, entries[-1][0] if entries else since
+
+def load_chart_columns(source, hours, max_points, since=None):
+    """History columns for charts and their cursor: the full window, or only samples newer than since"""
+    if since is None:
+        cursor = history_cursor(source)
+        return load_chart_window(source, hours, max_points), cursor
+    entries, cursor = history_delta(source, since, hours)
+    return load_entry_columns(entries), cursor
+
+def select_rollup_tier(hours, max_points):
+    """Finest rollup tier whose bucket count for the window fits the point budget"""
+    for tier, width in TIERS:
+        if hours * 3600 / width <= max_points:
+            return tier
+    return TIERS[-1][0]
+
+def _load_rollups(source, tier, cutoff_time, field='avg'):
+    """Load rollup buckets of a tier since cutoff_time as converted samples
+    
+    field picks the bucket values the samples hold: 'avg' (with the bucket's
+    min and max attached), 'min' or 'max'.
+    """
+    identities = {}
+    cutoff = cutoff_time.timestamp()
+    width = TIER_WIDTHS[tier]
+    
+    by_start = {}
+    for path, offset, line in history_store.rollups.lines(source, tier, cutoff_time):
+        key = _sample_cache_key((zlib.crc32(line), path, offset), identities)
+        if key:
+            key += (field,)
+        cached = sample_cache.get(key) if key else None
+        if cached is None:
+            try:
+                bucket = json.loads(line)
+            except ValueError:
+                continue
+            cached = (bucket['start'], _convert_rollup(bucket, field))
+            if key:
+                sample_cache.put(key, cached)
+        if cached[0] + width > cutoff:
+            by_start.setdefault(cached[0], []).append((cached[1], line))
+    
+    # Samples that arrived late were closed as extra buckets with the same start
+    samples = []
+    for start in sorted(by_start):
+        found = by_start[start]
+        if len(found) == 1:
+            samples.append(found[0][0])
+        else:
+            samples.append(_convert_rollup(merge_buckets([json.loads(line) for _, line in found]), field))
+    
+    # The still-open bucket carries the most recent samples
+    bucket = history_store.rollups.open_bucket(source, tier)
+    if bucket and bucket['start'] + width > cutoff:
+        samples.append(_convert_rollup(bucket, field))
+    
+    return samples
+
+def _convert_rollup(bucket, field='avg'):
+    """Convert a rollup bucket to a sample holding averages, with min/max attached, or its min or max values"""
+    if field != 'avg':
+        return _convert_metrics(materialize(bucket, field))
+    converted = _convert_metrics(materialize(bucket))
+    converted['rollup'] = {
+        'tier': bucket['tier'],
+        'count': bucket['count'],
+        'start': datetime.fromtimestamp(bucket['start']).isoformat(),
+        'end': datetime.fromtimestamp(bucket['end']).isoformat(),
+        'min': flatten_numeric(_convert_metrics(materialize(bucket, 'min'))),
+        'max': flatten_numeric(_convert_metrics(materialize(bucket, 'max')))
+    }
+    return converted
+
+def _load_history_entries(entries):
+    """Convert index entries to samples, parsing only those not already cached"""
+    return _load_cached_entries(entries, sample_cache)
+
+def _load_cached_entries(entries, cache, build=None, shared=None):
+    """Load index entries through a cache of converted (or further reduced) samples
+    
+    build(converted, epoch), when given, turns a converted sample into the
+    value that is cached and returned. shared is a cache common to all worker
+    processes, consulted before parsing and filled with what was parsed.
+    """
+    identities = {}
+    historical_data = [None] * len(entries)
+    pending = {}
+    
+    for pos, entry in enumerate(entries):
+        key = _sample_cache_key(entry, identities)
+        if key is None:
+            continue
+        cached = cache.get(key)
+        if cached is None:
+            pending[entry] = (pos, key)
+        else:
+            historical_data[pos] = cached
+    
+    if shared and pending:
+        found = shared.get_many([key for _, key in pending.values()])
+        for entry in list(pending):
+            pos, key = pending[entry]
+            if key in found:
+                cache.put(key, found[key])
+                historical_data[pos] = found[key]
+                del pending[entry]
+    
+    # Only samples that arrived (or were evicted) since the last request are parsed
+    parsed = []
+    for entry, data in history_store.read_entries(pending):
+        pos, key = pending[entry]
+        converted = _convert_metrics(data)
+        if converted:
+            if build:
+                converted = build(converted, entry[0])
+            cache.put(key, converted)
+            historical_data[pos] = converted
+            parsed.append((key, converted))
+    
+    if shared:
+        shared.put_many(parsed)
+    
+    return [data for data in historical_data if data]
+
+def _sample_cache_key(entry, identities):
+    """Cache key for an index entry: file path and identity, offset, and the entry's epoch
+
+    The first element of entry is the sample's index epoch (for rollups, a
+    checksum of the line), so a file that reuses a deleted file's path or
+    inode never matches the deleted file's samples.
+    """
+    stamp, path, offset = entry
+    identity = identities.get(path)
+    if identity is None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        # Segment lines are never rewritten in place; files written whole
+        # (legacy samples, archives, gzip'd rollups) also carry mtime and size
+        identity = (path, st.st_dev, st.st_ino)
+        if offset < 0 or is_archive(path) or path.endswith(COMPRESSED_SUFFIX):
+            identity += (st.st_mtime_ns, st.st_size)
+        identities[path] = identity
+    return identity + (offset, None if stamp is None else round(stamp, 6))
+
+def forget_history_files(paths):
+    """Drop cached samples of history files that were removed, e.g. by compaction"""
+    for cache in (sample_cache, compact_cache, shared_cache):
+        if cache is not None:
+            cache.discard_paths(paths)
+
+history_store.removal_listeners.append(forget_history_files)
+
+def warm_history_cache():
+    """Parse recent history of every source so the first dashboard load is warm"""
+    if shared_cache:
+        # One worker parses, the others then load its samples from the shared cache
+        with shared_cache.exclusive():
+            _warm_sources()
+    else:
+        _warm_sources()
+
+def request_source(args):
+    """The source= argument of a request ('windows' when missing); raises ValueError
+    
+    Only local collectors and sources with history on disk are accepted, so
+    a request can neither reach paths outside the history directory nor
+    make the reporter keep state for made-up sources.
+    """
+    source = args.get('source', 'windows')
+    if source in HISTORY_SOURCES or history_store.has_source(source):
+        return source
+    raise ValueError(f'Unknown source: {source}')
+
+def all_sources():
+    """Local collectors first, then every host that pushes samples"""
+    return list(dict.fromkeys(HISTORY_SOURCES + tuple(history_store.sources())))
+
+def _warm_sources():
+    for source in all_sources():
+        try:
+            # Charts only need compact samples; full documents are cached on first API use
+            load_history_columns(HISTORY_CACHE_WARM_HOURS, source)
+        except Exception as e:
+            app.logger.warning('History cache warm-up failed for %s: %s', source, e)
+
+# =================================================================
+# Chart Generation Functions
+# =================================================================
+
+# Static parts of the chart figures. Time-series traces name the history
+# column they plot; everything else is sent to the dashboard once.
+CHART_SPECS = {
+    'cpu': {
+        'traces': [
+            {'column': 'cpu.usage_percent', 'mode': 'lines+markers', 'name': 'CPU Usage',
+             'line': dict(color='#3498db', width=2)}
+        ],
+        'layout': dict(title='CPU Usage Over Time', xaxis_title='Time', yaxis_title='Usage (%)',
+                       yaxis=dict(range=[0, 100]), template='plotly_white')
+    },
+    'memory': {
+        'traces': [
+            {'column': 'memory.usage_percent', 'mode': 'lines+markers', 'name': 'Memory Usage',
+             'line': dict(color='#e74c3c', width=2)},
+            {'column': 'memory.swap_usage_percent', 'mode': 'lines+markers', 'name': 'Swap Usage',
+             'line': dict(color='#f39c12', width=2)}
+        ],
+        'layout': dict(title='Memory Usage Over Time', xaxis_title='Time', yaxis_title='Usage (%)',
+                       yaxis=dict(range=[0, 100]), template='plotly_white')
+    },
+    'network': {
+        'traces': [
+            {'column': 'network.rx_mb', 'mode': 'lines', 'name': 'Received', 'fill': 'tozeroy',
+             'line': dict(color='#3498db')},
+            {'column': 'network.tx_mb', 'mode': 'lines', 'name': 'Transmitted', 'fill': 'tozeroy',
+             'line': dict(color='#e74c3c')}
+        ],
+        'layout': dict(title='Network Traffic', xaxis_title='Time', yaxis_title='Data (MB)',
+                       template='plotly_white')
+    },
+    'disk': {
+        'traces': [
+            {'type': 'bar', 'textposition': 'outside'}
+        ],
+        'layout': dict(title='Disk Usage by Filesystem', xaxis_title='Mount Point', yaxis_title='Usage (%)',
+                       yaxis=dict(range=[0, 100]), template='plotly_white')
+    }
+}
+
+TIME_SERIES_CHARTS = ('cpu', 'memory', 'network')
+
+def _trace_style(trace):
+    """Plotly attributes of a trace spec, without the column name"""
+    return {key: value for key, value in trace.items() if key != 'column'}
+
+def _time_series_chart(name, columns, max_points=None):
+    """Build a time-series figure from history columns, one LTTB pass per trace"""
+    import plotly.graph_objs as go
+    import plotly.utils
+    
+    spec = CHART_SPECS[name]
+    fig = go.Figure()
+    for trace in spec['traces']:
+        # Keep at most max_points per trace without losing spikes
+        timestamps, values = downsample(columns.epochs, columns[trace['column']], max_points, columns.timestamps)
+        fig.add_trace(go.Scatter(x=timestamps, y=values, **_trace_style(trace)))
+    fig.update_layout(**spec['layout'])
     return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
 
-def generate_disk_chart(latest_data):
-    """Generate disk usage chart"""
+def _disk_usage(latest_data):
+    """Mount points, usage and status colors of the latest snapshot"""
     filesystems = latest_data['disk']['filesystems']
     
     mounts = [fs['mount'] for fs in filesystems]
     usage = [float(fs['usage_percent']) for fs in filesystems]
     
     colors = ['#2ecc71' if u < 70 else '#f39c12' if u < 90 else '#e74c3c' for u in usage]
+    return mounts, usage, colors
+
+def generate_cpu_chart(columns, max_points=None):
+    """Generate CPU usage chart"""
+    return _time_series_chart('cpu', columns, max_points)
+
+def generate_memory_chart(columns, max_points=None):
+    """Generate memory usage chart"""
+    return _time_series_chart('memory', columns, max_points)
+
+def generate_disk_chart(latest_data):
+    """Generate disk usage chart"""
+    import plotly.graph_objs as go
+    import plotly.utils
+    
+    mounts, usage, colors = _disk_usage(latest_data)
     
     fig = go.Figure()
     fig.add_trace(go.Bar(
@@ -275,58 +592,308 @@ def generate_disk_chart(latest_data):
         textposition='outside'
     ))
     
-    fig.update_layout(
-        title='Disk Usage by Filesystem',
-        xaxis_title='Mount Point',
-        yaxis_title='Usage (%)',
-        yaxis=dict(range=[0, 100]),
-        template='plotly_white'
-    )
+    fig.update_layout(**CHART_SPECS['disk']['layout'])
     
     return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
 
-def generate_network_chart(historical_data):
+def generate_network_chart(columns, max_points=None):
     """Generate network traffic chart"""
-    timestamps = []
-    total_rx = []
-    total_tx = []
+    return _time_series_chart('network', columns, max_points)
+
+# =================================================================
+# Compact Chart Payloads
+# =================================================================
+
+_chart_layouts = None
+
+def chart_layouts():
+    """Static layouts and trace styles of every chart, expanded once per process"""
+    global _chart_layouts
+    if _chart_layouts is None:
+        import plotly.graph_objs as go
+        import plotly.utils
+        
+        layouts = {}
+        for name, spec in CHART_SPECS.items():
+            layout = go.Figure(layout=spec['layout']).to_plotly_json()['layout']
+            if name in TIME_SERIES_CHARTS:
+                # Compact payloads send x as epoch milliseconds
+                layout.setdefault('xaxis', {})['type'] = 'date'
+            layouts[name] = {
+                'layout': layout,
+                'traces': [_trace_style(trace) for trace in spec['traces']]
+            }
+        _chart_layouts = json.dumps(layouts, cls=plotly.utils.PlotlyJSONEncoder)
+    return _chart_layouts
+
+def pack_array(values, dtype):
+    """Base64 of a little-endian typed array, decoded by the dashboard without JSON parsing"""
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+def generate_chart_data(columns, latest, max_points=None):
+    """Data-only chart payload: packed x/y arrays per trace plus the disk snapshot"""
+    local_ms = columns.local_ms()
+    charts = {}
+    for name in TIME_SERIES_CHARTS:
+        traces = []
+        for trace in CHART_SPECS[name]['traces']:
+            values = columns[trace['column']]
+            indices = lttb_indices(columns.epochs, values, max_points)
+            traces.append({
+                'x': pack_array(local_ms[indices], '<f8'),
+                'y': pack_array(values[indices], '<f4')
+            })
+        charts[name] = {'traces': traces}
     
-    for data in historical_data:
-        timestamps.append(data['system_info']['collection_time'])
+    mounts, usage, colors = _disk_usage(latest)
+    charts['disk'] = {
+        'x': mounts,
+        'y': usage,
+        'colors': colors,
+        'text': [f'{u:.1f}%' for u in usage]
+    }
+    return charts
+
+# =================================================================
+# Live Stream
+# =================================================================
+
+_broadcasters = {}
+_broadcasters_lock = threading.Lock()
+
+def generate_chart_delta(columns):
+    """New points per chart trace, shaped for Plotly.extendTraces"""
+    return {
+        'x': columns.local_ms().tolist(),
+        'charts': {
+            name: [[None if value != value else value for value in columns[trace['column']].tolist()]
+                   for trace in CHART_SPECS[name]['traces']]
+            for name in TIME_SERIES_CHARTS
+        }
+    }
+
+def stream_broadcaster(source):
+    """Shared broadcaster pushing each new sample of a source to all stream clients"""
+    with _broadcasters_lock:
+        if source in _broadcasters:
+            return _broadcasters[source]
         
-        interfaces = data['network']['interfaces']
-        rx = sum(int(iface['rx_bytes']) for iface in interfaces) / (1024**2)  # Convert to MB
-        tx = sum(int(iface['tx_bytes']) for iface in interfaces) / (1024**2)
+        state = {'since': 0.0}
         
-        total_rx.append(rx)
-        total_tx.append(tx)
+        def reset():
+            state['since'] = history_cursor(source)
+        
+        def poll():
+            entries, state['since'] = history_delta(source, state['since'])
+            if not entries:
+                return []
+            columns = load_entry_columns(entries)
+            if not len(columns):
+                return []
+            return [format_sse('sample', generate_chart_delta(columns), state['since'])]
+        
+        broadcaster = Broadcaster(poll, STREAM_POLL_INTERVAL, reset=reset)
+        _broadcasters[source] = broadcaster
+        return broadcaster
+
+# =================================================================
+# Response Caching
+# =================================================================
+
+def response_etag(key, version):
+    """ETag of a cached response for a data version"""
+    return hashlib.sha1(repr((key, version)).encode('utf-8')).hexdigest()
+
+def cached_json_body(key, version, build):
+    """(status, JSON body) of a response cached on the data version
     
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=timestamps,
-        y=total_rx,
-        mode='lines',
-        name='Received',
-        fill='tozeroy',
-        line=dict(color='#3498db')
-    ))
-    fig.add_trace(go.Scatter(
-        x=timestamps,
-        y=total_tx,
-        mode='lines',
-        name='Transmitted',
-        fill='tozeroy',
-        line=dict(color='#e74c3c')
-    ))
+    build() returns (payload, status), payload being JSON-serializable or
+    already encoded bytes, and only runs when the cached response is missing
+    or older than version. Error responses are not cached.
+    """
+    cached = response_cache.get(key)
+    if cached is None or cached[0] != version:
+        payload, status = build()
+        if status != 200:
+            return status, app.json.dumps(payload)
+        cached = (version, payload if isinstance(payload, bytes) else app.json.dumps(payload))
+        response_cache.put(key, cached)
+    return 200, cached[1]
+
+def cached_report(key, version, render):
+    """Rendered report text cached on the data version; render() only runs when it is missing or stale"""
+    cached = response_cache.get(key)
+    if cached is None or cached[0] != version:
+        cached = (version, render())
+        response_cache.put(key, cached)
+    return cached[1]
+
+def cached_json_response(key, version, build):
+    """Serve a JSON response cached on the data version, with ETag / If-None-Match
     
-    fig.update_layout(
-        title='Network Traffic',
-        xaxis_title='Time',
-        yaxis_title='Data (MB)',
-        template='plotly_white'
-    )
+    Unchanged polls get a 304 without any work.
+    """
+    etag = response_etag(key, version)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
     
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    status, body = cached_json_body(key, version, build)
+    response = app.response_class(body, status=status, mimetype='application/json')
+    if status == 200:
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+    return response
+
+# =================================================================
+# Response Builders
+# =================================================================
+
+# Shared by the Flask routes and the ASGI entry point (reporter_asgi.py)
+
+def build_latest():
+    """Payload of /api/latest"""
+    # Documents already in reporter format are served as written by the collector
+    raw = latest_snapshots.raw('windows')
+    if raw:
+        return raw, 200
+    latest = load_latest_metrics()
+    if latest:
+        return latest, 200
+    return {'error': 'No data available'}, 404
+
+def build_charts(source, hours, max_points, since=None):
+    """Payload of /api/charts: full Plotly figures"""
+    latest = load_source_metrics(source)
+    columns, cursor = load_chart_columns(source, hours, max_points, since)
+    
+    if not latest or (since is None and not len(columns)):
+        return {'error': 'Insufficient data'}, 404
+    
+    charts = {
+        'cpu': generate_cpu_chart(columns, max_points),
+        'memory': generate_memory_chart(columns, max_points),
+        'disk': generate_disk_chart(latest),
+        'network': generate_network_chart(columns, max_points),
+        'cursor': cursor
+    }
+    return charts, 200
+
+def build_chart_data(source, hours, max_points, since=None):
+    """Payload of /api/charts/data: packed series and the disk snapshot"""
+    latest = load_source_metrics(source)
+    columns, cursor = load_chart_columns(source, hours, max_points, since)
+    
+    if not latest or (since is None and not len(columns)):
+        return {'error': 'Insufficient data'}, 404
+    
+    charts = generate_chart_data(columns, latest, max_points)
+    charts['cursor'] = cursor
+    return charts, 200
+
+def historical_samples(source, hours, max_points=None, since=None, fields=None):
+    """(sample iterator, cursor) of /api/historical: a full window or the delta after since
+    
+    With fields (from parse_fields), samples only hold those paths and are
+    built from the columns (ring buffer and compact sample cache) without
+    decoding any document.
+    """
+    if fields:
+        if since is not None:
+            entries, cursor = history_delta(source, since, hours)
+            columns = load_entry_columns(entries)
+        else:
+            cursor = history_cursor(source)
+            columns = load_history_columns(hours, source, max_points)
+        return project_columns(columns, fields), cursor
+    
+    if since is not None:
+        entries, cursor = history_delta(source, since, hours)
+        samples = iter_history_entries(entries)
+    else:
+        cursor = history_cursor(source)
+        samples = iter_historical_metrics(hours, source, max_points)
+    return samples, cursor
+
+def history_json(payload):
+    """JSON text of /api/historical: the whole array, or one NDJSON line's sample, sorted as jsonify does"""
+    return json.dumps(payload, separators=(',', ':'), sort_keys=True)
+
+def stream_resume(source, last_event_id):
+    """SSE message with the samples a reconnecting client missed, or None"""
+    try:
+        resume = parse_since(last_event_id)
+    except (TypeError, ValueError):
+        return None
+    entries, cursor = history_delta(source, resume, 24)
+    columns = load_entry_columns(entries)
+    if not len(columns):
+        return None
+    return format_sse('sample', generate_chart_delta(columns), cursor)
+
+def ingest_batch(body, encoding):
+    """(payload, status, headers) of /api/ingest for one posted NDJSON batch"""
+    if len(body) > INGEST_MAX_BATCH_BYTES:
+        return {'error': f'Batch larger than {INGEST_MAX_BATCH_BYTES} bytes'}, 413, {}
+    try:
+        data = decode_body(body, encoding, INGEST_MAX_BATCH_BYTES)
+        samples = parse_batch(data)
+    except BatchTooLarge as e:
+        return {'error': str(e)}, 413, {}
+    except ValueError as e:
+        return {'error': str(e)}, 400, {}
+    try:
+        queued, duplicates = ingestor.submit(samples, len(data))
+    except queue.Full:
+        return {'error': 'Ingest queue full'}, 429, {'Retry-After': str(INGEST_RETRY_AFTER)}
+    return {'queued': queued, 'duplicates': duplicates}, 202, {}
+
+def fleet_query(args):
+    """(metric, window seconds, top) of /api/fleet arguments; raises ValueError"""
+    metric = args.get('metric', 'cpu.usage_percent')
+    if metric not in COLUMN_NAMES:
+        raise ValueError(f"Unknown metric, expected one of: {', '.join(COLUMN_NAMES)}")
+    try:
+        top = max(0, int(args.get('top', 10)))
+    except ValueError:
+        raise ValueError('Invalid top')
+    return metric, parse_window(args.get('window', '1h')), top
+
+def fleet_version():
+    """(sources, time bucket): changes when a source appears or every FLEET_REFRESH_SECONDS
+
+    Keyed on time rather than on every host's sample count, as with
+    hundreds of hosts pushing some host has a new sample on almost every
+    request, which would rebuild the summary each time.
+    """
+    return tuple(history_store.sources()), int(time.time() // FLEET_REFRESH_SECONDS)
+
+def load_fleet_series(source, hours, metric):
+    """(values, bucket maxima or None) of one metric of a source over a window
+    
+    Windows of more than FLEET_MAX_POINTS samples are summarized from the
+    finest rollup tier that fits: bucket averages, plus the bucket maxima so
+    the reported max is the real peak.
+    """
+    cutoff_time = datetime.now() - timedelta(hours=hours)
+    entries = history_store.lookup(source, cutoff_time)
+    
+    if len(entries) > FLEET_MAX_POINTS:
+        tier = select_rollup_tier(hours, FLEET_MAX_POINTS)
+        averages = _load_rollups(source, tier, cutoff_time)
+        if averages:
+            peaks = _load_rollups(source, tier, cutoff_time, 'max')
+            return build_columns(averages)[metric], build_columns(peaks)[metric]
+    return _load_window_columns(source, entries, cutoff_time)[metric], None
+
+def build_fleet(metric, seconds, top):
+    """Payload of /api/fleet: per-host and fleet-wide statistics of one metric"""
+    sources = history_store.sources()
+    loaded = [load_fleet_series(source, seconds / 3600, metric) for source in sources]
+    summary = fleet_summary(sources, [values for values, _ in loaded], top, [peaks for _, peaks in loaded])
+    summary.update(metric=metric, window=seconds)
+    return summary, 200
 
 # =================================================================
 # Flask Routes
@@ -344,67 +911,192 @@ def index():
     return render_template('dashboard.html', 
                          windows_metrics=windows_metrics, 
                          wsl_metrics=wsl_metrics,
+                         chart_hours=CHART_HOURS,
                          metrics=windows_metrics or wsl_metrics)  # For backward compatibility
 
 @app.route('/api/latest')
 def api_latest():
     """API endpoint for latest metrics"""
-    latest = load_latest_metrics()
-    if latest:
-        return jsonify(latest)
-    return jsonify({'error': 'No data available'}), 404
+    return cached_json_response(('latest',), data_version('windows', history=False), build_latest)
 
 @app.route('/api/historical/<int:hours>')
 def api_historical(hours):
     """API endpoint for historical metrics"""
-    source = request.args.get('source', 'windows')
-    data = load_historical_metrics(hours, source)
-    return jsonify(data)
+    try:
+        source = request_source(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    max_points = request.args.get('max_points', type=int)
+    try:
+        since = parse_since(request.args['since']) if 'since' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Invalid since'}), 400
+    try:
+        fields = parse_fields(request.args['fields']) if 'fields' in request.args else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Delta mode: only samples newer than the client's cursor
+    samples, cursor = historical_samples(source, hours, max_points, since, fields)
+    
+    # Streaming mode: one sample per line as it is read, flat memory for any window
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            for sample in samples:
+                yield history_json(sample) + '\n'
+        response = app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+    else:
+        response = app.response_class(history_json(list(samples)), mimetype='application/json')
+    response.headers['X-History-Cursor'] = repr(cursor)
+    return response
 
 @app.route('/api/charts')
 def api_charts():
     """API endpoint for chart data"""
-    source = request.args.get('source', 'windows')
-    latest = load_windows_metrics() if source == 'windows' else load_wsl_metrics()
-    historical = load_historical_metrics(24, source)
+    try:
+        source = request_source(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    hours = request.args.get('hours', CHART_HOURS, type=int)
+    max_points = request.args.get('max_points', CHART_MAX_POINTS, type=int)
+    try:
+        since = parse_since(request.args['since']) if 'since' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Invalid since'}), 400
     
-    if not latest or not historical:
-        return jsonify({'error': 'Insufficient data'}), 404
+    build = partial(build_charts, source, hours, max_points, since)
     
-    charts = {
-        'cpu': generate_cpu_chart(historical),
-        'memory': generate_memory_chart(historical),
-        'disk': generate_disk_chart(latest),
-        'network': generate_network_chart(historical)
-    }
+    # Deltas differ per client cursor and are cheap, so they bypass the response cache
+    if since is not None:
+        payload, status = build()
+        return jsonify(payload), status
+    
+    key = ('charts', source, hours, max_points)
+    return cached_json_response(key, data_version(source), build)
+
+@app.route('/api/charts/layout')
+def api_charts_layout():
+    """Static chart layouts and trace styles, cacheable by the browser"""
+    response = app.response_class(chart_layouts(), mimetype='application/json')
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route('/api/charts/data')
+def api_charts_data():
+    """Data-only chart payload with numeric series as base64 typed arrays"""
+    try:
+        source = request_source(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    hours = request.args.get('hours', CHART_HOURS, type=int)
+    max_points = request.args.get('max_points', CHART_MAX_POINTS, type=int)
+    try:
+        since = parse_since(request.args['since']) if 'since' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Invalid since'}), 400
+    
+    build = partial(build_chart_data, source, hours, max_points, since)
+    
+    if since is not None:
+        payload, status = build()
+        return jsonify(payload), status
+    
+    key = ('charts_data', source, hours, max_points)
+    return cached_json_response(key, data_version(source), build)
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events stream of new samples as chart deltas"""
+    try:
+        source = request_source(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    broadcaster = stream_broadcaster(source)
+    # since= is the cursor of the client's initial load, until it has an event id of its own
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+    
+    def generate():
+        subscription = broadcaster.subscribe()
+        try:
+            yield 'retry: 5000\n\n'
+            # A reconnecting client first gets what it missed while disconnected
+            missed = stream_resume(source, last_event_id) if last_event_id else None
+            if missed:
+                yield missed
+            while True:
+                try:
+                    yield subscription.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            broadcaster.unsubscribe(subscription)
     
-    return jsonify(charts)
+    response = app.response_class(stream_with_context(generate()), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/fleet')
+def api_fleet():
+    """API endpoint for per-host and fleet-wide p50/p95/max of one metric"""
+    try:
+        metric, seconds, top = fleet_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return cached_json_response(('fleet', metric, seconds, top), fleet_version(),
+                                partial(build_fleet, metric, seconds, top))
+
+@app.route('/api/ingest', methods=['POST'])
+def api_ingest():
+    """Accept a (gzip'd) NDJSON batch of samples pushed by remote agents"""
+    if request.content_length and request.content_length > INGEST_MAX_BATCH_BYTES:
+        return jsonify({'error': f'Batch larger than {INGEST_MAX_BATCH_BYTES} bytes'}), 413
+    payload, status, headers = ingest_batch(request.get_data(), request.headers.get('Content-Encoding'))
+    return jsonify(payload), status, headers
 
 @app.route('/report/html')
 def report_html():
-    """Generate and serve HTML report"""
-    source = request.args.get('source', 'windows')
-    latest = load_windows_metrics() if source == 'windows' else load_wsl_metrics()
-    historical = load_historical_metrics(24, source)
+    """Serve the HTML report: the newest pre-rendered one, or rendered now with fresh=1 or other hours"""
+    try:
+        source = request_source(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    hours = request.args.get('hours', REPORT_HOURS, type=int)
+    fresh = request.args.get('fresh') in ('1', 'true')
     
-    if not latest:
-        return 'No data available', 404
+    path = None if fresh else prerendered_report(source, 'html', hours)
+    if path:
+        return send_file(path, mimetype='text/html')
     
-    return render_template('report.html', latest=latest, historical=historical)
+    html = render_report(source, 'html', hours, save=fresh)
+    if html is None:
+        return 'No data available', 404
+    response = app.response_class(html, mimetype='text/html')
+    response.set_etag(response_etag(('report_html', source, hours), data_version(source)))
+    return response.make_conditional(request)
 
 @app.route('/report/markdown')
 def report_markdown():
-    """Generate and serve Markdown report"""
+    """Download the Markdown report: the newest pre-rendered one, or rendered now with fresh=1 or other hours"""
     from io import BytesIO
     
-    source = request.args.get('source', 'windows')
-    latest = load_windows_metrics() if source == 'windows' else load_wsl_metrics()
+    try:
+        source = request_source(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    hours = request.args.get('hours', REPORT_HOURS, type=int)
+    fresh = request.args.get('fresh') in ('1', 'true')
     
-    if not latest:
-        return 'No data available', 404
+    path = None if fresh else prerendered_report(source, 'markdown', hours)
+    if path:
+        return send_file(path, as_attachment=True, download_name=os.path.basename(path),
+                         mimetype='text/markdown')
     
-    # Generate markdown content
-    md_content = generate_markdown_report(latest, source)
+    md_content = render_report(source, 'markdown', hours, save=fresh)
+    if md_content is None:
+        return 'No data available', 404
     
     # Create in-memory file
     buffer = BytesIO()
@@ -424,8 +1116,135 @@ def report_markdown():
 # Report Generation
 # =================================================================
 
-def generate_markdown_report(metrics, source='windows'):
-    """Generate markdown report from metrics"""
+def render_report(source, fmt, hours=REPORT_HOURS, save=False):
+    """Report text of a source in 'html' or 'markdown', None without data
+    
+    Renders are cached until the source has new data. With save, a report
+    of a pre-rendered format and the default window is also written to
+    REPORTS_DIR, so it is what later requests get.
+    """
+    latest = load_source_metrics(source)
+    if not latest:
+        return None
+    
+    def render():
+        columns = load_history_columns(hours, source, REPORT_MAX_SAMPLES)
+        stats = build_report_stats(columns, latest)
+        if fmt == 'markdown':
+            return generate_markdown_report(latest, source, hours, stats)
+        return render_template('report.html', latest=latest, hours=hours, stats=stats,
+                               charts=build_report_charts(columns, hours, stats))
+    text = cached_report((f'report_{fmt}', source, hours), data_version(source), render)
+    
+    if save and hours == REPORT_HOURS and fmt in report_scheduler.formats:
+        report_scheduler.write(source, fmt, text)
+    return text
+
+def prerender_report(source, fmt):
+    """Render a report outside of any request, for the scheduler"""
+    with app.app_context():
+        return render_report(source, fmt)
+
+def prerendered_report(source, fmt, hours):
+    """Path of the newest pre-rendered report of a source, when one exists for this request"""
+    if hours != REPORT_HOURS or fmt not in report_scheduler.formats:
+        return None
+    return report_scheduler.newest(source, fmt)
+
+def build_report_stats(columns, latest):
+    """Window statistics of the report metrics over history columns"""
+    cores = latest.get('cpu', {}).get('core_count')
+    return window_stats(columns, report_thresholds, cores if isinstance(cores, (int, float)) else None)
+
+def build_report_charts(columns, hours, stats):
+    """SVG trend charts of the report metrics: per-bucket mean line inside a min/max band
+    
+    The bucket width is the finest rollup tier giving at most
+    REPORT_MAX_BUCKETS over the window, so the page size and render time
+    do not depend on how often samples are taken. None without data.
+    """
+    width = TIER_WIDTHS[select_rollup_tier(hours, REPORT_MAX_BUCKETS)]
+    starts, series = bucket_series(columns, width)
+    if not len(starts):
+        return None
+    
+    chart_width, chart_height = REPORT_CHART_SIZE
+    first, last = starts[0], starts[-1] + width
+    x = (starts + width / 2 - first) / (last - first) * chart_width
+    # Buckets farther apart than one missing bucket are not joined
+    gaps = np.r_[False, np.diff(starts) > width * 1.5]
+    
+    charts = []
+    for row in stats:
+        if not row['samples']:
+            continue
+        lows, means, highs = series[row['column']]
+        top = 100.0 if row['unit'] == '%' else max(float(np.nanmax(highs)), row['threshold']) * 1.1 or 1.0
+        y = lambda values: chart_height - np.clip(values, 0, top) / top * chart_height
+        line, band = _svg_paths(x, y(lows), y(means), y(highs), np.isnan(means) | gaps, np.isnan(means))
+        charts.append({
+            'label': row['label'],
+            'unit': row['unit'],
+            'top': top,
+            'threshold_y': float(y(row['threshold'])),
+            'line': line,
+            'band': band
+        })
+    
+    unit = f'{width // 3600}-hour' if width >= 3600 else f'{width // 60}-minute'
+    return {
+        'series': charts,
+        'width': chart_width,
+        'height': chart_height,
+        'buckets': len(starts),
+        'bucket': unit,
+        'start': datetime.fromtimestamp(first).strftime('%Y-%m-%d %H:%M'),
+        'end': datetime.fromtimestamp(last).strftime('%Y-%m-%d %H:%M')
+    }
+
+def _svg_paths(x, lows, means, highs, breaks, missing):
+    """(line, band) SVG path data over bucket x positions, restarted where breaks is set"""
+    runs = []
+    for i in range(len(x)):
+        if breaks[i] or not runs:
+            runs.append([])
+        if not missing[i]:
+            runs[-1].append(i)
+    
+    line = []
+    band = []
+    for run in filter(None, runs):
+        points = ' L'.join(f'{x[i]:.1f},{means[i]:.1f}' for i in run)
+        # A lone bucket is drawn as a dot by the round line cap
+        line.append(f'M{points}' + (' h0' if len(run) == 1 else ''))
+        upper = ' L'.join(f'{x[i]:.1f},{highs[i]:.1f}' for i in run)
+        lower = ' L'.join(f'{x[i]:.1f},{lows[i]:.1f}' for i in reversed(run))
+        band.append(f'M{upper} L{lower} Z')
+    return ' '.join(line), ' '.join(band)
+
+def generate_markdown_stats(stats, hours):
+    """Markdown table of window statistics"""
+    if not stats:
+        return ''
+    samples = max(row['samples'] for row in stats)
+    table = f"""
+## Window Statistics (last {hours} h, {samples} samples)
+
+| Metric | Min | Mean | P50 | P95 | P99 | Max | Threshold | Time Above |
+|--------|-----|------|-----|-----|-----|-----|-----------|------------|
+"""
+    for row in stats:
+        unit = row['unit']
+        if not row['samples']:
+            table += f"| {row['label']} | – | – | – | – | – | – | {row['threshold']:g}{unit} | – |\n"
+            continue
+        values = ' | '.join(f"{row[key]:.1f}{unit}" for key in ('min', 'mean', 'p50', 'p95', 'p99', 'max'))
+        table += (f"| {row['label']} | {values} | {row['threshold']:g}{unit} | "
+                  f"{format_uptime(row['above_seconds'])} ({row['above_percent']:.1f}%) |\n")
+    return table
+
+def generate_markdown_report(metrics, source='windows', hours=REPORT_HOURS, stats=None):
+    """Generate markdown report from metrics, with window statistics when given"""
     report = f"""# System Monitoring Report ({source.upper()})
 
 **Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  
@@ -437,7 +1256,7 @@ def generate_markdown_report(metrics, source='windows'):
 - **Architecture:** {metrics['system_info']['architecture']}
 - **CPU Cores:** {metrics['cpu']['core_count']}
 - **CPU Frequency:** {metrics['cpu']['frequency_ghz']:.2f} GHz
-
+{generate_markdown_stats(stats, hours)}
 ## Current Metrics
 
 ### CPU
@@ -513,6 +1332,8 @@ def format_uptime(seconds):
     minutes = int((seconds % 3600) // 60)
     return f"{days}d {hours}h {minutes}m"
 
+app.add_template_filter(format_uptime)
+
 # =================================================================
 # Main Entry Point
 # =================================================================
@@ -522,6 +1343,15 @@ def health():
     """Health check endpoint for container"""
     return jsonify({"status": "healthy", "service": "system-monitor-dashboard"}), 200
 
+# Warm the history cache in the background at startup
+if HISTORY_CACHE_WARM_HOURS > 0:
+    threading.Thread(target=warm_history_cache, name='history-cache-warmer', daemon=True).start()
+
+# Pre-render reports every REPORT_INTERVAL when reporting is enabled; started by the
+# servers (here and in the ASGI lifespan), not on import, so tools and tests stay idle
+report_scheduler = ReportScheduler(REPORTS_DIR, report_formats(REPORT_FORMAT) if ENABLE_REPORTING else (),
+                                   REPORT_INTERVAL, prerender_report, all_sources)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080, debug=False)
+    report_scheduler.start()
     app.run(host='0.0.0.0', port=8080, debug=False)
@@ -0,0 +1,335 @@
+"""
+System Monitor Reporter - ASGI Entry Point
+Non-blocking variant of the dashboard for many concurrent clients
+
+The API routes run on the event loop: file reads, parsing and rendering are
+done in worker threads, and /api/stream clients are plain coroutines, so
+idle streams cost no thread each. Every other route (dashboard page,
+reports) is served by the Flask app in a worker thread.
+
+Usage: uvicorn reporter_asgi:app --app-dir reporting --host 0.0.0.0 --port 8080
+"""
+
+import io
+import sys
+import json
+import asyncio
+from functools import partial
+from urllib.parse import parse_qs
+
+import reporter
+from live_stream import AsyncSubscription
+
+# Samples serialized per worker-thread hop when streaming NDJSON
+NDJSON_BATCH = 200
+
+
+def _query(scope):
+    """First value of every query-string argument"""
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return {name: values[0] for name, values in query.items()}
+
+
+def _header(scope, name):
+    name = name.lower().encode('latin-1')
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _int_arg(args, name, default=None):
+    try:
+        return int(args[name])
+    except (KeyError, ValueError):
+        return default
+
+
+async def _send_response(send, status, body, content_type='application/json', headers=()):
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode('latin-1')),
+                    (b'content-length', str(len(body)).encode('latin-1'))] + list(headers)
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_json(send, payload, status=200, headers=()):
+    await _send_response(send, status, json.dumps(payload, separators=(',', ':')), headers=headers)
+
+
+async def _cached(scope, send, key, version_func, build):
+    """ASGI counterpart of reporter.cached_json_response"""
+    version = await asyncio.to_thread(version_func)
+    etag = '"' + reporter.response_etag(key, version) + '"'
+    if etag in (_header(scope, 'if-none-match') or ''):
+        await send({'type': 'http.response.start', 'status': 304, 'headers': [(b'etag', etag.encode('latin-1'))]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    status, body = await asyncio.to_thread(reporter.cached_json_body, key, version, build)
+    headers = [(b'etag', etag.encode('latin-1')), (b'cache-control', b'no-cache')] if status == 200 else []
+    await _send_response(send, status, body, headers=headers)
+
+
+def _since(args):
+    """The since= argument as epoch seconds, None when absent; raises ValueError"""
+    return reporter.parse_since(args['since']) if 'since' in args else None
+
+
+async def api_latest(scope, receive, send):
+    await _cached(scope, send, ('latest',), partial(reporter.data_version, 'windows', history=False),
+                  reporter.build_latest)
+
+
+async def api_historical(scope, receive, send, hours):
+    args = _query(scope)
+    try:
+        source = reporter.request_source(args)
+    except ValueError as e:
+        await _send_json(send, {'error': str(e)}, 400)
+        return
+    try:
+        since = _since(args)
+    except ValueError:
+        await _send_json(send, {'error': 'Invalid since'}, 400)
+        return
+    try:
+        fields = reporter.parse_fields(args['fields']) if 'fields' in args else None
+    except ValueError as e:
+        await _send_json(send, {'error': str(e)}, 400)
+        return
+
+    samples, cursor = await asyncio.to_thread(
+        reporter.historical_samples, source, hours, _int_arg(args, 'max_points'), since, fields)
+    headers = [(b'x-history-cursor', repr(cursor).encode('latin-1'))]
+
+    if args.get('format') != 'ndjson':
+        body = await asyncio.to_thread(lambda: reporter.history_json(list(samples)))
+        await _send_response(send, 200, body, headers=headers)
+        return
+
+    def next_batch():
+        lines = []
+        for sample in samples:
+            lines.append(reporter.history_json(sample) + '\n')
+            if len(lines) >= NDJSON_BATCH:
+                break
+        return ''.join(lines).encode('utf-8')
+
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'application/x-ndjson')] + headers})
+    while True:
+        chunk = await asyncio.to_thread(next_batch)
+        if not chunk:
+            break
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _charts(scope, send, name, build):
+    args = _query(scope)
+    try:
+        source = reporter.request_source(args)
+    except ValueError as e:
+        await _send_json(send, {'error': str(e)}, 400)
+        return
+    hours = _int_arg(args, 'hours', reporter.CHART_HOURS)
+    max_points = _int_arg(args, 'max_points', reporter.CHART_MAX_POINTS)
+    try:
+        since = _since(args)
+    except ValueError:
+        await _send_json(send, {'error': 'Invalid since'}, 400)
+        return
+
+    build = partial(build, source, hours, max_points, since)
+    if since is not None:
+        payload, status = await asyncio.to_thread(build)
+        await _send_json(send, payload, status)
+        return
+    await _cached(scope, send, (name, source, hours, max_points), partial(reporter.data_version, source), build)
+
+
+async def api_charts(scope, receive, send):
+    await _charts(scope, send, 'charts', reporter.build_charts)
+
+
+async def api_charts_data(scope, receive, send):
+    await _charts(scope, send, 'charts_data', reporter.build_chart_data)
+
+
+async def api_fleet(scope, receive, send):
+    try:
+        metric, seconds, top = reporter.fleet_query(_query(scope))
+    except ValueError as e:
+        await _send_json(send, {'error': str(e)}, 400)
+        return
+    await _cached(scope, send, ('fleet', metric, seconds, top), reporter.fleet_version,
+                  partial(reporter.build_fleet, metric, seconds, top))
+
+
+async def api_stream(scope, receive, send):
+    """Server-Sent Events stream; an idle client is one coroutine waiting on its queue"""
+    args = _query(scope)
+    try:
+        source = reporter.request_source(args)
+    except ValueError as e:
+        await _send_json(send, {'error': str(e)}, 400)
+        return
+    broadcaster = reporter.stream_broadcaster(source)
+    subscription = AsyncSubscription(asyncio.get_running_loop(), broadcaster.queue_size)
+    await asyncio.to_thread(broadcaster.subscribe, subscription)
+
+    async def wait_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    disconnected = asyncio.ensure_future(wait_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]})
+        await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+
+        # A reconnecting client first gets what it missed while disconnected
+        # since= is the cursor of the client's initial load, until it has an event id of its own
+        last_event_id = _header(scope, 'last-event-id') or args.get('since')
+        if last_event_id:
+            missed = await asyncio.to_thread(reporter.stream_resume, source, last_event_id)
+            if missed:
+                await send({'type': 'http.response.body', 'body': missed.encode('utf-8'), 'more_body': True})
+
+        while True:
+            message = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait({message, disconnected}, timeout=reporter.STREAM_KEEPALIVE,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                message.cancel()
+                break
+            if message in done:
+                body = message.result()
+            else:
+                message.cancel()
+                body = ': keepalive\n\n'
+            await send({'type': 'http.response.body', 'body': body.encode('utf-8'), 'more_body': True})
+    finally:
+        disconnected.cancel()
+        broadcaster.unsubscribe(subscription)
+
+
+async def health(scope, receive, send):
+    await _send_json(send, {'status': 'healthy', 'service': 'system-monitor-dashboard'})
+
+
+ROUTES = {
+    '/api/latest': api_latest,
+    '/api/charts': api_charts,
+    '/api/charts/data': api_charts_data,
+    '/api/fleet': api_fleet,
+    '/api/stream': api_stream,
+    '/health': health,
+}
+
+
+async def _read_body(receive, limit):
+    """Request body, or None as soon as it is known to be larger than limit bytes"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def _run_wsgi(environ):
+    """Run the Flask app for one request, returning (status, headers, body)"""
+    result = {}
+
+    def start_response(status, headers, exc_info=None):
+        result['status'] = int(status.split(' ', 1)[0])
+        result['headers'] = headers
+
+    chunks = reporter.app(environ, start_response)
+    try:
+        body = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return result['status'], result['headers'], body
+
+
+async def wsgi_fallback(scope, receive, send):
+    """Serve a route the ASGI app does not implement natively through Flask in a thread"""
+    # The largest body any route takes is an ingest batch
+    limit = reporter.INGEST_MAX_BATCH_BYTES
+    length = _header(scope, 'content-length')
+    body = None if length and length.isdigit() and int(length) > limit else await _read_body(receive, limit)
+    if body is None:
+        await _send_json(send, {'error': f'Request body larger than {limit} bytes'}, 413)
+        return
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for key, value in scope['headers']:
+        name = key.decode('latin-1').upper().replace('-', '_')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value.decode('latin-1')
+        elif name != 'CONTENT_LENGTH':
+            environ['HTTP_' + name] = value.decode('latin-1')
+
+    status, headers, payload = await asyncio.to_thread(_run_wsgi, environ)
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]})
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Every worker starts it; the one holding the reports lock renders
+                reporter.report_scheduler.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    path = scope['path']
+    if scope['method'] == 'GET':
+        route = ROUTES.get(path)
+        if route:
+            await route(scope, receive, send)
+            return
+        if path.startswith('/api/historical/') and path[len('/api/historical/'):].isdigit():
+            await api_historical(scope, receive, send, int(path[len('/api/historical/'):]))
+            return
+    await wsgi_fallback(scope, receive, send)
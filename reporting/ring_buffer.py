@@ -0,0 +1,187 @@
+"""
+System Monitor Ring Buffer
+Fixed-size memory-mapped file of the most recent samples of one source, in chart columns
+
+Collectors write a record per sample (HistoryStore.append does it); the
+reporter maps the file read-only and serves recent windows straight from
+it as NumPy arrays, with no JSON parsing at all.
+"""
+
+import os
+import mmap
+import time
+import struct
+import zlib
+import threading
+
+from fields import COLUMN_NAMES
+
+# history/ring/<source>.ring
+RING_DIR = 'ring'
+RING_SUFFIX = '.ring'
+RING_CAPACITY = int(os.getenv('HISTORY_RING_CAPACITY', '2048'))
+
+# Header: magic, layout, capacity, record size, sequence, records written, and the
+# newest epoch of a sample that arrived late and was left out (0 when none)
+HEADER = struct.Struct('<4sIQQQQd')
+HEADER_SIZE = 64
+MAGIC = b'SMRB'
+SEQ_OFFSET = 24
+COUNT_OFFSET = 32
+LATE_OFFSET = 40
+
+# A record is the epoch followed by the COLUMN_NAMES values, all float64
+FIELDS = 1 + len(COLUMN_NAMES)
+RECORD = struct.Struct(f'<{FIELDS}d')
+LAYOUT_VERSION = zlib.crc32(','.join(COLUMN_NAMES).encode('utf-8')) & 0x7fffffff
+
+# Oldest records a reader leaves alone, as the writer may be about to reuse their slots
+READ_MARGIN = 16
+READ_RETRIES = 10
+
+
+def _create(path, capacity):
+    """Write an empty ring under a temporary name and move it into place"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, LAYOUT_VERSION, capacity, RECORD.size, 0, 0, 0.0).ljust(HEADER_SIZE, b'\0'))
+        f.truncate(HEADER_SIZE + capacity * RECORD.size)
+    os.replace(tmp, path)
+
+
+def _valid_header(header, capacity=None):
+    magic, layout, ring_capacity, record_size = header[:4]
+    return (magic == MAGIC and layout == LAYOUT_VERSION and record_size == RECORD.size
+            and (capacity is None or ring_capacity == capacity))
+
+
+def append_record(path, epoch, values, capacity=RING_CAPACITY):
+    """Write one sample into the ring, seqlock style
+
+    The sequence number is odd while the record is being written; readers
+    that see it change retry. Samples not newer than the last record are
+    skipped, an older one (e.g. spooled by a pushing agent) being noted in
+    the header so readers know the ring lacks it. A ring of another layout
+    or capacity is replaced. There
+    must be one writer per ring at a time (HistoryStore.append holds the
+    source's manifest lock).
+    """
+    for attempt in range(2):
+        try:
+            f = open(path, 'r+b')
+        except FileNotFoundError:
+            _create(path, capacity)
+            continue
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size != HEADER_SIZE + capacity * RECORD.size:
+                header = None
+            else:
+                header = HEADER.unpack(f.read(HEADER.size))
+            if header is None or not _valid_header(header, capacity):
+                if attempt:
+                    return
+                _create(path, capacity)
+                continue
+
+            with mmap.mmap(f.fileno(), 0) as mm:
+                seq, count, late = header[4], header[5], header[6]
+                if count:
+                    last = RECORD.unpack_from(mm, HEADER_SIZE + (count - 1) % capacity * RECORD.size)[0]
+                    if epoch < last and epoch > late:
+                        struct.pack_into('<Q', mm, SEQ_OFFSET, seq + 1)
+                        struct.pack_into('<d', mm, LATE_OFFSET, epoch)
+                        struct.pack_into('<Q', mm, SEQ_OFFSET, seq + 2)
+                    if epoch <= last:
+                        return
+                struct.pack_into('<Q', mm, SEQ_OFFSET, seq + 1)
+                RECORD.pack_into(mm, HEADER_SIZE + count % capacity * RECORD.size, epoch, *values)
+                struct.pack_into('<Q', mm, COUNT_OFFSET, count + 1)
+                struct.pack_into('<Q', mm, SEQ_OFFSET, seq + 2)
+        return
+
+
+class RingReader:
+    """Read-only mapping of a source's ring, remapped when the file is replaced"""
+
+    def __init__(self, path):
+        import numpy as np
+        self._np = np
+        self.path = path
+        self._identity = None
+        self._mm = None
+        self._records = None
+        self._lock = threading.Lock()
+
+    def _map(self):
+        """The record matrix of the current file, or None"""
+        with self._lock:
+            return self._remap()
+
+    def _remap(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._identity = self._records = None
+            return None
+        identity = (st.st_dev, st.st_ino, st.st_size)
+        if identity != self._identity:
+            self._identity = identity
+            self._records = None
+            try:
+                with open(self.path, 'rb') as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return None
+            header = HEADER.unpack_from(mm)
+            if not _valid_header(header) or len(mm) != HEADER_SIZE + header[2] * RECORD.size:
+                return None
+            # The old mapping stays alive as long as arrays handed out still view it
+            self._mm = mm
+            self._records = self._np.frombuffer(mm, dtype=self._np.float64, offset=HEADER_SIZE,
+                                                count=header[2] * FIELDS).reshape(header[2], FIELDS)
+        return self._records
+
+    def recent(self, start):
+        """(epochs, {column: values}, oldest epoch held) of the records at or after epoch start, or None
+
+        The matching rows are copied out of the mapping in one block and the
+        copy is only returned if the sequence number did not change
+        meanwhile, so a concurrent write can never tear it. The epochs and
+        columns are views of that block. None too when a sample left out
+        for arriving late falls inside the rows returned.
+        """
+        np = self._np
+        records = self._map()
+        if records is None:
+            return None
+        capacity = len(records)
+
+        for _ in range(READ_RETRIES):
+            seq, count = struct.unpack_from('<QQ', self._mm, SEQ_OFFSET)
+            if seq & 1:
+                time.sleep(0)
+                continue
+
+            available = min(count, capacity - READ_MARGIN)
+            if available <= 0:
+                return None
+            first = count - available
+            lo, hi = first % capacity, count % capacity or capacity
+            if lo < hi:
+                oldest = records[lo, 0]
+                skip = np.searchsorted(records[lo:hi, 0], start)
+                rows = records[lo + skip:hi].copy()
+            else:
+                rows = np.concatenate((records[lo:], records[:hi]))
+                oldest = rows[0, 0]
+                rows = rows[np.searchsorted(rows[:, 0], start):]
+
+            late = struct.unpack_from('<d', self._mm, LATE_OFFSET)[0]
+            if struct.unpack_from('<Q', self._mm, SEQ_OFFSET)[0] == seq:
+                if late >= max(start, oldest):
+                    return None
+                columns = {name: rows[:, i + 1] for i, name in enumerate(COLUMN_NAMES)}
+                return rows[:, 0], columns, float(oldest)
+        return None
@@ -0,0 +1,258 @@
+"""
+System Monitor Rollups
+Incrementally maintained 1m/5m/1h min/max/avg/last tiers of the metrics history
+"""
+
+import os
+import copy
+import gzip
+import sys
+import json
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: compaction only runs from the shell scripts, so appends need no lock
+    fcntl = None
+
+# (name, bucket width in seconds), finest first
+TIERS = (('1m', 60), ('5m', 300), ('1h', 3600))
+TIER_WIDTHS = dict(TIERS)
+
+# Closed buckets: history/rollups/<tier>/<source>/YYYYMMDD.ndjson
+# Open buckets:   history/rollups/<source>.open.json
+ROLLUPS_DIR = 'rollups'
+DAY_FORMAT = '%Y%m%d'
+DAY_SUFFIX = '.ndjson'
+
+# Closed days are gzip'd by compact_history.py; buckets closed late go to a new plain file
+COMPRESSED_SUFFIX = '.gz'
+
+
+@contextmanager
+def locked_day_file(path, mode='ab'):
+    """A plain day file held exclusively against its writers and compaction, across processes
+
+    Compaction gzips and removes a plain day file under this lock, so a file
+    removed while waiting for it is opened again (created anew when appending).
+    """
+    while True:
+        with open(path, mode) as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    current = os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+                except FileNotFoundError:
+                    current = False
+                if not current:
+                    continue
+            yield f
+            return
+
+
+def flatten_numeric(doc, prefix=''):
+    """Flatten the numeric leaves of a document into {'a.b.0.c': value}"""
+    flat = {}
+    items = doc.items() if isinstance(doc, dict) else enumerate(doc)
+    for key, value in items:
+        path = f'{prefix}{key}'
+        if isinstance(value, bool) or value is None:
+            continue
+        if isinstance(value, (int, float)):
+            flat[path] = value
+        elif isinstance(value, (dict, list)):
+            flat.update(flatten_numeric(value, path + '.'))
+    return flat
+
+
+def _set_path(doc, path, value):
+    """Set a dotted path produced by flatten_numeric inside a document"""
+    keys = path.split('.')
+    node = doc
+    try:
+        for key in keys[:-1]:
+            node = node[int(key)] if isinstance(node, list) else node[key]
+        last = keys[-1]
+        if isinstance(node, list):
+            node[int(last)] = value
+        else:
+            node[last] = value
+    except (KeyError, IndexError, ValueError, TypeError):
+        pass
+
+
+def materialize(bucket, field='avg'):
+    """Build a sample document from a bucket: the last sample with numeric fields
+    replaced by the bucket's avg (or min/max) values"""
+    doc = copy.deepcopy(bucket['last'])
+    lows, highs = bucket['min'], bucket['max']
+    for path, value in bucket[field].items():
+        # A field constant over the bucket keeps its sampled value and type, e.g. an int core count
+        if path in lows and lows[path] == highs.get(path):
+            value = lows[path]
+        _set_path(doc, path, value)
+
+    timestamp = datetime.fromtimestamp(bucket['start']).isoformat()
+    doc['timestamp'] = timestamp
+    if isinstance(doc.get('system_info'), dict):
+        doc['system_info']['collection_time'] = timestamp
+    return doc
+
+
+def merge_buckets(buckets):
+    """One finished bucket of several with the same start, e.g. a bucket and samples closed late"""
+    buckets = sorted(buckets, key=lambda bucket: bucket['end'])
+    merged = dict(buckets[-1], count=sum(bucket['count'] for bucket in buckets),
+                  min={}, max={}, avg={})
+    totals, counts = {}, {}
+    for bucket in buckets:
+        for path, value in bucket['min'].items():
+            merged['min'][path] = min(value, merged['min'].get(path, value))
+        for path, value in bucket['max'].items():
+            merged['max'][path] = max(value, merged['max'].get(path, value))
+        for path, value in bucket['avg'].items():
+            totals[path] = totals.get(path, 0) + value * bucket['count']
+            counts[path] = counts.get(path, 0) + bucket['count']
+    merged['avg'] = {path: total / counts[path] for path, total in totals.items()}
+    return merged
+
+
+class Rollups:
+    """Rollup tiers of a history directory, updated as samples are appended"""
+
+    def __init__(self, history_dir):
+        self.rollups_dir = os.path.join(history_dir, ROLLUPS_DIR)
+
+    def day_path(self, source, tier, when):
+        """Path of the file holding closed buckets of a tier for one day"""
+        return os.path.join(self.rollups_dir, tier, source, when.strftime(DAY_FORMAT) + DAY_SUFFIX)
+
+    def state_path(self, source):
+        """Path of the open-bucket state of a source"""
+        return os.path.join(self.rollups_dir, source + '.open.json')
+
+    def _load_state(self, source):
+        try:
+            with open(self.state_path(source), 'rb') as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            return {'last': None, 'tiers': {}}
+
+    def _save_state(self, source, state):
+        path = self.state_path(source)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(json.dumps(state, separators=(',', ':')).encode('utf-8'))
+        os.replace(tmp, path)
+
+    def add(self, source, when, metrics):
+        """Fold one sample into the open bucket of every tier, closing finished buckets
+
+        A sample older than a tier's open bucket (e.g. spooled by a pushing
+        agent) is closed as a bucket of its own for its start; readers merge
+        it with the bucket closed before (merge_buckets).
+        """
+        os.makedirs(self.rollups_dir, exist_ok=True)
+        state = self._load_state(source)
+        epoch = when.timestamp()
+        values = flatten_numeric(metrics)
+        newest = max((bucket['end'] for bucket in state['tiers'].values()), default=None)
+
+        for tier, width in TIERS:
+            start = epoch - epoch % width
+            bucket = state['tiers'].get(tier)
+
+            if bucket and start != bucket['start']:
+                if start < bucket['start']:
+                    late = {'start': start, 'end': epoch, 'count': 1,
+                            'sum': values, 'min': values, 'max': values}
+                    self._close(source, tier, late, metrics)
+                    continue
+                self._close(source, tier, bucket, state['last'])
+                bucket = None
+
+            if bucket is None:
+                bucket = {'start': start, 'end': epoch, 'count': 0, 'sum': {}, 'min': {}, 'max': {}}
+                state['tiers'][tier] = bucket
+
+            bucket['end'] = epoch
+            bucket['count'] += 1
+            sums, mins, maxs = bucket['sum'], bucket['min'], bucket['max']
+            for path, value in values.items():
+                sums[path] = sums.get(path, 0) + value
+                if path not in mins or value < mins[path]:
+                    mins[path] = value
+                if path not in maxs or value > maxs[path]:
+                    maxs[path] = value
+
+        if newest is None or epoch >= newest:
+            state['last'] = metrics
+        self._save_state(source, state)
+
+    def _close(self, source, tier, bucket, last):
+        """Append a finished bucket to its tier's day file"""
+        path = self.day_path(source, tier, datetime.fromtimestamp(bucket['start']))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        line = json.dumps(self._finish(tier, bucket, last), separators=(',', ':')).encode('utf-8') + b'\n'
+        with locked_day_file(path) as f:
+            f.write(line)
+
+    @staticmethod
+    def _finish(tier, bucket, last):
+        count = bucket['count']
+        return {
+            'tier': tier,
+            'start': bucket['start'],
+            'end': bucket['end'],
+            'count': count,
+            'min': bucket['min'],
+            'max': bucket['max'],
+            'avg': {path: total / count for path, total in bucket['sum'].items()},
+            'last': last
+        }
+
+    def lines(self, source, tier, start, end=None):
+        """Yield (path, offset, raw line) of closed buckets that may overlap [start, end]"""
+        day = datetime(start.year, start.month, start.day)
+        last_day = end or datetime.now()
+        while day <= last_day:
+            path = self.day_path(source, tier, day)
+            day += timedelta(days=1)
+            for path, opener in ((path + COMPRESSED_SUFFIX, gzip.open), (path, open)):
+                try:
+                    f = opener(path, 'rb')
+                except FileNotFoundError:
+                    continue
+                with f:
+                    offset = 0
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            break
+                        yield path, offset, line
+                        offset += len(line)
+
+    def open_bucket(self, source, tier):
+        """The still-open bucket of a tier as a finished bucket, or None"""
+        state = self._load_state(source)
+        bucket = state['tiers'].get(tier)
+        if not bucket or not state['last']:
+            return None
+        return self._finish(tier, bucket, state['last'])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Fold one sample read from stdin into the rollups of a source (for shell collectors)')
+    parser.add_argument('history_dir')
+    parser.add_argument('source')
+    parser.add_argument('epoch', type=float, help='sample time, as written to the time index')
+    args = parser.parse_args()
+
+    Rollups(args.history_dir).add(args.source, datetime.fromtimestamp(args.epoch), json.load(sys.stdin))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+System Monitor Sample Cache
+Bounded LRU caches for converted history samples and rendered responses
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU cache capped by entry count"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        """Return the cached value for a key, or None"""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used entries past the cap"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        """Size and hit counters for diagnostics"""
+        with self._lock:
+            return {
+                'entries': len(self._items),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+class SampleCache(LRUCache):
+    """LRU cache of converted samples, capped by sample count
+
+    Keys start with the path and identity of the file a sample was read
+    from (device, inode, and for files written whole the mtime and size),
+    so a replaced or rewritten file never serves stale data.
+    """
+
+    def discard_paths(self, paths):
+        """Drop the samples of the given files"""
+        paths = set(paths)
+        with self._lock:
+            for key in [key for key in self._items if key[0] in paths]:
+                del self._items[key]
@@ -0,0 +1,142 @@
+"""
+System Monitor Metrics Schema
+Versioned registry of converters that upgrade collector documents to the
+canonical reporter schema
+"""
+
+import os
+
+# Canonical reporter schema (system_info/cpu/memory/disk/network/gpu/system_load)
+SCHEMA_VERSION = 2
+SCHEMA_KEY = 'schema_version'
+
+# Version -> function upgrading a document of that version to the next one
+CONVERTERS = {}
+
+
+def converter(version):
+    """Register a converter from `version` to `version + 1`"""
+    def register(func):
+        CONVERTERS[version] = func
+        return func
+    return register
+
+
+def schema_version(doc):
+    """Schema version of a document: its tag, or detected from its shape for untagged documents"""
+    version = doc.get(SCHEMA_KEY)
+    if version is not None:
+        return version
+    # Python collectors before the tag existed (psutil layout in GB/MB)
+    if 'system' in doc and 'cpu' in doc:
+        return 1
+    return SCHEMA_VERSION
+
+
+def to_canonical(doc):
+    """Upgrade a document to SCHEMA_VERSION, returning canonical documents unchanged"""
+    version = schema_version(doc)
+    while version < SCHEMA_VERSION:
+        doc = CONVERTERS[version](doc)
+        version += 1
+    return doc
+
+
+def collector_output(metrics):
+    """Document a collector writes: canonical unless METRICS_SCHEMA=legacy"""
+    if os.getenv('METRICS_SCHEMA', 'canonical') == 'legacy':
+        return metrics
+    return to_canonical(metrics)
+
+
+@converter(1)
+def _from_psutil(data):
+    """psutil layout of monitor_windows/linux/mac.py -> canonical schema"""
+    return {
+        SCHEMA_KEY: 2,
+        'system_info': {
+            'hostname': data['system']['hostname'],
+            'platform': data['system']['platform'],
+            'version': data['system'].get('version', 'Unknown'),
+            'architecture': data['system'].get('architecture', 'Unknown'),
+            'collection_time': data.get('timestamp', ''),
+            'uptime_seconds': 0
+        },
+        'cpu': {
+            'usage_percent': data['cpu']['usage_percent'],
+            'temperature_celsius': data['cpu'].get('temperature', 'N/A'),
+            'core_count': data['cpu']['count'],
+            'model': 'Unknown',
+            'frequency_ghz': data['cpu']['frequency_mhz'] / 1000
+        },
+        'memory': {
+            'total_bytes': int(data['memory']['total_gb'] * 1024**3),
+            'used_bytes': int(data['memory']['used_gb'] * 1024**3),
+            'available_bytes': int(data['memory']['available_gb'] * 1024**3),
+            'usage_percent': data['memory']['percent'],
+            'swap_total_bytes': int(data['swap']['total_gb'] * 1024**3),
+            'swap_used_bytes': int(data['swap']['used_gb'] * 1024**3),
+            'swap_usage_percent': data['swap']['percent']
+        },
+        'disk': {
+            'filesystems': [
+                {
+                    'device': d['device'],
+                    'mount': d['mountpoint'],
+                    'total': int(d['total_gb'] * 1024**3),
+                    'used': int(d['used_gb'] * 1024**3),
+                    'available': int(d['free_gb'] * 1024**3),
+                    'usage_percent': d['percent']
+                } for d in data.get('disk', [])
+            ],
+            'io_stats': {
+                'reads_completed': 0,
+                'writes_completed': 0,
+                'bytes_read': 0,
+                'bytes_written': 0
+            },
+            'smart_status': 'N/A'
+        },
+        'network': {
+            'interfaces': [
+                {
+                    'interface': 'All',
+                    'rx_bytes': int(data['network']['bytes_recv_mb'] * 1024**2),
+                    'rx_packets': data['network']['packets_recv'],
+                    'rx_errors': 0,
+                    'tx_bytes': int(data['network']['bytes_sent_mb'] * 1024**2),
+                    'tx_packets': data['network']['packets_sent'],
+                    'tx_errors': 0
+                }
+            ],
+            'active_connections': 0,
+            'active_interface_names': ['All']
+        },
+        'gpu': {
+            'gpu': {
+                'vendor': 'NVIDIA' if data.get('gpu', {}).get('available') else 'None',
+                'name': data.get('gpu', {}).get('name', 'No GPU detected'),
+                'count': 1 if data.get('gpu', {}).get('available') else 0,
+                'utilization_percent': data.get('gpu', {}).get('utilization', 0),
+                'memory_used_bytes': int(data.get('gpu', {}).get('memory_used_mb', 0) * 1024**2),
+                'memory_total_bytes': int(data.get('gpu', {}).get('memory_total_mb', 1) * 1024**2),
+                'memory_percent': (data.get('gpu', {}).get('memory_used_mb', 0) / data.get('gpu', {}).get('memory_total_mb', 1) * 100) if data.get('gpu', {}).get('memory_total_mb', 0) > 0 else 0,
+                'temperature_celsius': data.get('gpu', {}).get('temperature', 0),
+                'power_watts': 0
+            },
+            'timestamp': data.get('timestamp', '')
+        },
+        'system_load': {
+            'load_average': {
+                '1min': data.get('system_load', {}).get('load_average', {}).get('1min', 0),
+                '5min': data.get('system_load', {}).get('load_average', {}).get('5min', 0),
+                '15min': data.get('system_load', {}).get('load_average', {}).get('15min', 0)
+            },
+            'total_processes': data.get('system_load', {}).get('total_processes', 0),
+            'running_processes': data.get('system_load', {}).get('running_processes', 0),
+            'sleeping_processes': data.get('system_load', {}).get('sleeping_processes', 0),
+            'zombie_processes': data.get('system_load', {}).get('zombie_processes', 0),
+            'top_cpu_processes': data.get('system_load', {}).get('top_cpu_processes', []),
+            'timestamp': data.get('timestamp', '')
+        }
+    }
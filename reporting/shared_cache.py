@@ -0,0 +1,123 @@
+"""
+System Monitor Shared Sample Cache
+SQLite file holding compact history samples for every worker process of the reporter
+"""
+
+import zlib
+import fcntl
+import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
+
+from columns import COLUMN_NAMES, Sample
+
+# Bumped whenever the chart columns change, so stale rows are never decoded
+LAYOUT_VERSION = zlib.crc32(','.join(COLUMN_NAMES).encode('utf-8')) & 0x7fffffff
+VALUES_SIZE = 8 * len(COLUMN_NAMES)
+
+# SQLite's default limit on bound parameters is 999
+QUERY_BATCH = 900
+
+
+def _encode_key(key):
+    return ':'.join(str(part) for part in key)
+
+
+def _encode(sample):
+    epoch = array('d', [sample.epoch])
+    return epoch.tobytes() + sample.values.tobytes() + sample.timestamp.encode('utf-8')
+
+
+def _decode(blob):
+    epoch = array('d')
+    epoch.frombytes(blob[:8])
+    values = array('d')
+    values.frombytes(blob[8:8 + VALUES_SIZE])
+    return Sample(blob[8 + VALUES_SIZE:].decode('utf-8'), epoch[0], values)
+
+
+class SharedSampleCache:
+    """Compact samples keyed like SampleCache, stored in one SQLite file
+
+    Worker processes of a multi-worker server look samples up here before
+    parsing history themselves, so each sample is parsed once per host
+    rather than once per worker. Rows past max_entries are dropped oldest
+    first.
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        db = self._db()
+        if db.execute('PRAGMA user_version').fetchone()[0] != LAYOUT_VERSION:
+            with db:
+                db.execute('DROP TABLE IF EXISTS samples')
+                db.execute('CREATE TABLE samples (key TEXT PRIMARY KEY, value BLOB NOT NULL)')
+                db.execute(f'PRAGMA user_version = {LAYOUT_VERSION}')
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def get_many(self, keys):
+        """{key: Sample} for the keys present"""
+        encoded = {_encode_key(key): key for key in keys}
+        names = list(encoded)
+        found = {}
+        db = self._db()
+        for start in range(0, len(names), QUERY_BATCH):
+            batch = names[start:start + QUERY_BATCH]
+            rows = db.execute(
+                f"SELECT key, value FROM samples WHERE key IN ({','.join('?' * len(batch))})", batch
+            )
+            for name, blob in rows:
+                if len(blob) >= 8 + VALUES_SIZE:
+                    found[encoded[name]] = _decode(blob)
+        return found
+
+    def put_many(self, items):
+        """Store (key, Sample) pairs, trimming the table to max_entries"""
+        rows = [(_encode_key(key), _encode(sample)) for key, sample in items]
+        if not rows:
+            return
+        db = self._db()
+        with db:
+            db.executemany('INSERT OR REPLACE INTO samples (key, value) VALUES (?, ?)', rows)
+
+        with self._lock:
+            self._writes += len(rows)
+            trim = self._writes >= 1000
+            if trim:
+                self._writes = 0
+        if trim:
+            with db:
+                db.execute('DELETE FROM samples WHERE rowid <= (SELECT MAX(rowid) FROM samples) - ?',
+                           (self.max_entries,))
+
+    def discard_paths(self, paths):
+        """Drop the samples of the given files"""
+        db = self._db()
+        with db:
+            for path in paths:
+                prefix = _encode_key((path, ''))
+                db.execute('DELETE FROM samples WHERE substr(key, 1, ?) = ?', (len(prefix), prefix))
+
+    @contextmanager
+    def exclusive(self):
+        """Hold a host-wide lock, e.g. so only one worker parses history at a time"""
+        with open(self.path + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
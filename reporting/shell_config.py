@@ -0,0 +1,24 @@
+"""
+System Monitor Shell Configuration
+Reads the KEY=VALUE files under config/ that the shell scripts source
+"""
+
+
+def read_shell_config(path):
+    """{key: value} of a shell-style config file, {} when it cannot be read
+
+    Comments and surrounding quotes are dropped; ${VAR} references are
+    left as written.
+    """
+    config = {}
+    try:
+        with open(path) as f:
+            lines = f.readlines()
+    except OSError:
+        return config
+    for line in lines:
+        key, sep, value = line.split('#', 1)[0].partition('=')
+        key = key.strip()
+        if sep and key.isidentifier():
+            config[key] = value.strip().strip('"\'')
+    return config
@@ -163,7 +163,9 @@ check_alerts() {
 
 cleanup_old_metrics() {
     local retention_days="${RETENTION_DAYS:-7}"
-    cleanup_old_files "$DATA_DIR" "$retention_days"
+    # History is compacted into daily archives with its own retention instead of deleted
+    compact_history "${DATA_DIR}/history"
+    cleanup_old_files "$DATA_DIR" "$retention_days" "${DATA_DIR}/history"
 }
 
 # =================================================================
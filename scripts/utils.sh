@@ -274,13 +274,32 @@ format_uptime() {
 cleanup_old_files() {
     local dir="$1"
     local days_to_keep="${2:-7}"
+    local skip_dir="$3"
     
     if [ ! -d "$dir" ]; then
         return 0
     fi
     
     log_debug "Cleaning up files older than $days_to_keep days in $dir"
-    find "$dir" -type f -mtime +$days_to_keep -delete 2>/dev/null
+    if [ -n "$skip_dir" ]; then
+        find "$dir" -path "$skip_dir" -prune -o -type f -mtime +$days_to_keep -exec rm -f {} + 2>/dev/null
+    else
+        find "$dir" -type f -mtime +$days_to_keep -delete 2>/dev/null
+    fi
+}
+
+compact_history() {
+    local history_dir="$1"
+    local script="${PROJECT_ROOT}/reporting/compact_history.py"
+    
+    if [ ! -d "$history_dir" ] || [ ! -f "$script" ] || ! check_command python3; then
+        return 0
+    fi
+    
+    log_debug "Compacting history in $history_dir"
+    python3 "$script" --history-dir "$history_dir" \
+        --raw-days "${HISTORY_RAW_DAYS:-30}" \
+        --rollup-days "${HISTORY_ROLLUP_DAYS:-1m=30,5m=180,1h=730}"
 }
 
 # =================================================================
@@ -294,4 +313,4 @@ export -f to_json to_json_number format_bytes format_percentage
 export -f ensure_directory get_timestamp get_iso_timestamp
 export -f check_threshold is_number is_valid_json
 export -f get_hostname get_uptime_seconds format_uptime
-export -f cleanup_old_files
+export -f cleanup_old_files compact_history
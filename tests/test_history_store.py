@@ -0,0 +1,52 @@
+"""
+Tests for the history store's time index
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'reporting'))
+
+from history_store import HistoryStore
+
+
+def canonical_sample(when, cpu):
+    """Canonical v2 document as the collectors write it: no top-level timestamp"""
+    return {
+        'schema_version': 2,
+        'system_info': {'hostname': 'test', 'collection_time': when.strftime('%Y-%m-%dT%H:%M:%S')},
+        'cpu': {'usage_percent': cpu},
+    }
+
+
+class RebuildManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.history_dir = tempfile.mkdtemp(prefix='history_store_test_')
+        self.addCleanup(shutil.rmtree, self.history_dir)
+
+    def test_sample_epoch_falls_back_to_collection_time(self):
+        when = datetime(2024, 5, 1, 12, 30, 0)
+        self.assertEqual(HistoryStore.sample_epoch(canonical_sample(when, 1.0)), when.timestamp())
+
+    def test_rebuilds_manifest_from_canonical_segments(self):
+        store = HistoryStore(self.history_dir)
+        start = datetime.now().replace(microsecond=0) - timedelta(hours=3)
+        # Spans several hourly segments
+        for i in range(864):
+            store.append('wsl', canonical_sample(start + timedelta(seconds=10 * i), i % 100))
+        os.remove(store.manifest_path('wsl'))
+
+        entries = HistoryStore(self.history_dir).lookup('wsl', start - timedelta(minutes=1))
+        self.assertEqual(len(entries), 864)
+        self.assertEqual([epoch for epoch, _, _ in entries],
+                         [(start + timedelta(seconds=10 * i)).timestamp() for i in range(864)])
+        samples = [data for _, data in HistoryStore(self.history_dir).read_entries(entries)]
+        self.assertEqual([data['cpu']['usage_percent'] for data in samples], [i % 100 for i in range(864)])
+
+
+if __name__ == '__main__':
+    unittest.main()